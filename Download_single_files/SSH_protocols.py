@@ -1,7 +1,10 @@
 from scipy.io import loadmat
 import sys
 import os
+import io
 import paramiko
+import threading
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append(r'C:\Users\Max Tost\Desktop\Notebooks\SPC Neural Network Project')
 
 from PasswordLac import password as pw
@@ -11,28 +14,29 @@ port = 22
 username = "tost"
 password = pw()
 
-def load_mat_file(file_name, local_path, delete=True):
-    """
-    Downloads a .mat file from a remote server using SFTP, loads its contents, 
-    and removes the local copy after loading to save storage.
+# Module-level SSH/SFTP session, opened on first use and shared by all downloads of this module
+_ssh_client = None
+_sftp = None
 
-    Parameters:
-        file_name (str): The name of the .mat file to be downloaded.
-        local_path (str): The local directory where the file will be temporarily stored.
+def get_sftp_session():
+    """
+    Returns the shared read-only SFTP session, (re)connecting to the remote server if needed.
+    Reusing it saves the TCP and SSH handshakes for every file that is loaded.
 
     Returns:
-        dict: The contents of the .mat file as a Python dictionary, or None if an error occurs.
+        paramiko.SFTPClient: The open SFTP session.
     """
-    mat_contents = None  # Initialize the variable to store the .mat file contents
+    global _ssh_client, _sftp
 
-    try:
+    transport = _ssh_client.get_transport() if _ssh_client is not None else None
+    if _sftp is None or transport is None or not transport.is_active():
         # Initialize an SSH client
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # Accept unknown host keys
-        ssh_client.connect(hostname, port, username, password)  # Connect to the remote server
+        _ssh_client = paramiko.SSHClient()
+        _ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # Accept unknown host keys
+        _ssh_client.connect(hostname, port, username, password)  # Connect to the remote server
         
         # Open an SFTP session
-        sftp = ssh_client.open_sftp()
+        _sftp = _ssh_client.open_sftp()
         print("SFTP session established (read-only)!")
 
         # Define a function to disable write operations for this session
@@ -40,44 +44,77 @@ def load_mat_file(file_name, local_path, delete=True):
             raise PermissionError("This is a read-only session. Write operations are disabled.")
         
         # Overwrite SFTP write methods with the read-only function
-        sftp.put = read_only_error
-        sftp.remove = read_only_error
-        sftp.rename = read_only_error
+        _sftp.put = read_only_error
+        _sftp.remove = read_only_error
+        _sftp.rename = read_only_error
+
+    return _sftp
+
+def close_sftp_session():
+    """
+    Closes the shared SFTP session, if one is open.
+    """
+    global _ssh_client, _sftp
+
+    if _sftp is not None:
+        _sftp.close()
+        _ssh_client.close()
+        print("SFTP session closed.")
+    _ssh_client = None
+    _sftp = None
+
+def _read_remote_file(sftp, remote_file_path):
+    """
+    Reads a remote file into an in-memory buffer using pipelined SFTP reads.
+    """
+    with sftp.open(remote_file_path, 'rb') as remote_file:
+        remote_file.prefetch()  # Pipeline the SFTP read requests instead of waiting for each block
+        return io.BytesIO(remote_file.read())
+
+def load_mat_file(file_name, local_path=None, delete=True):
+    """
+    Downloads a .mat file from a remote server using SFTP and loads its contents.
+    The file is streamed into memory and parsed from there; it is only written to disk if a local copy is requested.
+
+    Parameters:
+        file_name (str): The name of the .mat file to be downloaded.
+        local_path (str, optional): The local directory where a copy of the file is stored if delete=False.
+        delete (bool): If False, a copy of the file is kept in local_path.
+
+    Returns:
+        dict: The contents of the .mat file as a Python dictionary, or None if an error occurs.
+    """
+    mat_contents = None  # Initialize the variable to store the .mat file contents
 
-        # Construct remote and local file paths
+    try:
+        sftp = get_sftp_session()
+
+        # Construct remote file path
         remote_file_path = r"/Lac8_D/DEFUSE/DEFUSE_DB/DB_mat/" + file_name  # Remote file location
-        local_file_path = local_path + "\\" + file_name  # Temporary local storage location
 
-        # Check if the file exists on the server
         try:
-            sftp.stat(remote_file_path)  # Check if the file exists (raises an exception if it doesn't)
-            print(f"File '{remote_file_path}' exists on the server.")
-            
-            # Download the file to the local directory
-            print(f"Downloading '{remote_file_path}' to '{local_file_path}'...")
-            sftp.get(remote_file_path, local_file_path)  # Perform the download
-            print("Download complete. Begin loading the file locally.")
-
-            # Load the downloaded .mat file into a dictionary
-            mat_contents = loadmat(local_file_path)  # Read the .mat file
+            # Download the file into memory (raises an exception if it doesn't exist)
+            print(f"Downloading '{remote_file_path}'...")
+            buffer = _read_remote_file(sftp, remote_file_path)
+            print("Download complete. Begin loading the file.")
+
+            # Load the .mat file into a dictionary directly from memory
+            mat_contents = loadmat(buffer)  # Read the .mat file
             print("MAT File Contents:")
             for key, value in mat_contents.items():
                 # Skip internal MATLAB metadata keys (e.g., '__header__', '__version__')
                 if not key.startswith("__"):
                     print(f"{key}: {type(value)}, Shape: {value.shape if hasattr(value, 'shape') else 'N/A'}")
-            if delete:
-                # Remove the downloaded file to save disk space
-                print(f"Deleting {local_file_path}. Variable remains.")
-                os.remove(local_file_path)
+            if not delete and local_path is not None:
+                # Keep a local copy of the downloaded file
+                local_file_path = os.path.join(local_path, file_name)
+                with open(local_file_path, 'wb') as local_file:
+                    local_file.write(buffer.getbuffer())
+                print(f"Saved a copy to '{local_file_path}'.")
 
         except FileNotFoundError:
             # Handle the case where the file doesn't exist on the server
             print(f"File '{remote_file_path}' does not exist on the server.")
-
-        # Close the SFTP session
-        sftp.close()
-        ssh_client.close()
-        print("SFTP session closed.")
     
     except Exception as e:
         # Handle any unexpected errors
@@ -87,6 +124,57 @@ def load_mat_file(file_name, local_path, delete=True):
     return mat_contents
 
 
+def load_mat_files(file_names, max_workers=4):
+    """
+    Loads several .mat files from the remote server over the shared SSH connection.
+    The files are streamed into memory and parsed directly, nothing is written to the local disk.
+    Downloads run concurrently in a thread pool, overlapping network transfer and parsing.
+    An SFTPClient is not safe to share between threads, so each worker opens its own SFTP channel on the shared transport.
+
+    Parameters:
+        file_names (list of str): The names of the .mat files to be loaded.
+        max_workers (int): Number of files downloaded and parsed concurrently.
+
+    Returns:
+        dict: Maps each file name to the contents of its .mat file, or to None if it could not be loaded.
+    """
+    mat_contents = {file_name: None for file_name in file_names}
+    thread_data = threading.local()
+    sessions = []
+
+    try:
+        get_sftp_session()  # Make sure the shared SSH connection is up
+
+        def load_one(file_name):
+            sftp = getattr(thread_data, 'sftp', None)
+            if sftp is None:
+                sftp = thread_data.sftp = _ssh_client.open_sftp()
+                sessions.append(sftp)
+            remote_file_path = r"/Lac8_D/DEFUSE/DEFUSE_DB/DB_mat/" + file_name  # Remote file location
+            try:
+                return file_name, loadmat(_read_remote_file(sftp, remote_file_path))
+            except FileNotFoundError:
+                print(f"File '{remote_file_path}' does not exist on the server.")
+            except Exception as e:
+                print(f"An error occurred while loading '{remote_file_path}': {e}")
+            return file_name, None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for file_name, contents in executor.map(load_one, file_names):
+                mat_contents[file_name] = contents
+    
+    except Exception as e:
+        # Handle any unexpected errors
+        print(f"An error occurred: {e}")
+
+    finally:
+        # Close the per-thread SFTP channels, the shared connection stays open
+        for sftp in sessions:
+            sftp.close()
+
+    return mat_contents
+
+
 def list_remote_files():
     """
     Connects to the remote server and returns a list of files in the target directory.
@@ -3,8 +3,68 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import random
+from concurrent.futures import ThreadPoolExecutor
 
-def load_all_data(path, features_list, features_sequence = ['SSXcore', 'IPLA', 'DAO_EDG7', 'RNT', 'DAI_EDG7', 'ECE_PF'], test_size = 0.15, mini_test_size = 0.7):
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pv
+except ImportError:  # PyArrow is optional, pandas' C parser is used without it
+    pv = None
+
+
+def read_csv_columns(csv_file, columns):
+    """
+    Reads the given columns of a CSV file as float32 arrays.
+    Uses PyArrow's multithreaded CSV parser if it is installed, pandas otherwise.
+    
+    Parameters:
+    - csv_file: Path of the CSV file.
+    - columns: List of column names to read. Columns missing from the file are skipped.
+    
+    Returns:
+    - A dict mapping each requested column found in the file to a 1D float32 NumPy array.
+    """
+    if pv is None:
+        df = pd.read_csv(csv_file, usecols=lambda c: c in columns, dtype=np.float32)
+        return {key: df[key].to_numpy() for key in df.columns}
+    
+    # PyArrow refuses to include columns that do not exist, so check the header first
+    with open(csv_file) as f:
+        header = f.readline().rstrip('\r\n').split(',')
+    present = [key for key in columns if key in header]
+    
+    table = pv.read_csv(csv_file, convert_options=pv.ConvertOptions(
+        include_columns=present, column_types={key: pa.float32() for key in present}))
+    # Empty fields (NaNs written by pandas) become nulls in Arrow and NaN again in NumPy
+    return {key: table.column(key).to_numpy() for key in present}
+
+
+def stack_features(columns, features_sequence):
+    """
+    Stacks feature columns so that each row is a datapoint and each column a feature; missing keys are filled with zeros.
+    
+    Parameters:
+    - columns: Dict of 1D arrays as returned by read_csv_columns, including 'time'.
+    - features_sequence: List of feature names, in the order of the output columns.
+    
+    Returns:
+    - x: A float32 array of shape (n_samples, len(features_sequence)).
+    - missing_keys: List of the keys of features_sequence that were not in columns.
+    """
+    # Allocate the destination once without initializing it and write every column into its slot,
+    # so each value is written exactly once; only the columns of missing keys are zeroed.
+    x = np.empty((len(columns['time']), len(features_sequence)), dtype=np.float32)
+    missing_keys = []
+    for j, key in enumerate(features_sequence):
+        if key in columns:
+            x[:, j] = columns[key]
+        else:
+            x[:, j] = 0.0
+            missing_keys.append(key)
+    return x, missing_keys
+
+
+def load_all_data(path, features_list, features_sequence = ['SSXcore', 'IPLA', 'DAO_EDG7', 'RNT', 'DAI_EDG7', 'ECE_PF'], test_size = 0.15, mini_test_size = 0.7, num_workers = None, seed = None):
     """
     Loads and stacks features and targets from a list of CSV files.
     
@@ -12,12 +72,20 @@ def load_all_data(path, features_list, features_sequence = ['SSXcore', 'IPLA', '
     - path: Base directory containing subdirectories 'features' and 'targets'.
     - features_list: List of file names to process.
     - features_sequence: List of feature names to extract from each CSV.
+    - num_workers: Number of threads loading files concurrently. Defaults to the ThreadPoolExecutor default.
+    - seed: If given, the files are shuffled with a local random generator seeded with it before splitting,
+      giving reproducible splits. By default the files are split in the given order.
     
     Returns:
     - all_x: A 2D NumPy array containing all feature datapoints.
     - all_y: A 1D NumPy array containing all target values.
     """
     
+    if seed is not None:
+        # Local generator: reproducible and leaves the global random state and the caller's list untouched
+        rng = np.random.default_rng(seed)
+        features_list = [features_list[i] for i in rng.permutation(len(features_list))]
+
     test_size = int(len(features_list) * test_size)
     mini_test_size = int(len(features_list) * mini_test_size)
     test_list = features_list[:test_size]
@@ -28,106 +96,38 @@ def load_all_data(path, features_list, features_sequence = ['SSXcore', 'IPLA', '
     features_dir = Path(path) / "features"
     targets_dir  = Path(path) / "targets"
     
-    # Lists to accumulate data from each file
-    all_x_train = []
-    all_x_test = []
-    all_y_train = []
-    all_y_test = []
-    all_x_mini_test = []
-    all_y_mini_test = []
-
-    for feature_id in train_list:
+    def load_file(feature_id):
         # Build full file paths
         feature_file = features_dir / feature_id
         target_file = targets_dir / feature_id
         
-        # Load features CSV
-        df_features = pd.read_csv(feature_file)
-        time_length = len(df_features['time'])
+        # Load the needed columns of the features CSV
+        columns = read_csv_columns(feature_file, ['time'] + list(features_sequence))
         
-        # Create a list for feature columns; if a key is missing, fill with zeros.
-        x_list = []
-        for key in features_sequence:
-            if key in df_features.columns:
-                x_list.append(df_features[key].to_numpy())
-            else:
-                print(f"Key {key} not in {feature_id}. Filling it with zeros.")
-                x_list.append(np.zeros(time_length))
-                
-        # Stack features so that each row is a datapoint and each column a feature.
-        # np.column_stack ensures the resulting array has shape (n_samples, len(features_sequence))
-        x = np.column_stack(x_list)
+        # Stack features so that each row is a datapoint and each column a feature; if a key is missing, fill with zeros.
+        x, missing_keys = stack_features(columns, features_sequence)
+        if missing_keys:
+            print(f"Keys {missing_keys} not in {feature_id}. Filling them with zeros.")
         
         # Load target CSV and extract the 'target' column
-        y = pd.read_csv(target_file)['target'].to_numpy()
+        y = read_csv_columns(target_file, ['target'])['target']
         
-        # Append this file's data to the overall lists
-        all_x_train.append(x)
-        all_y_train.append(y)
+        return x, y
 
-    for feature_id in test_list:
-        # Build full file paths
-        feature_file = features_dir / feature_id
-        target_file = targets_dir / feature_id
-        
-        # Load features CSV
-        df_features = pd.read_csv(feature_file)
-        time_length = len(df_features['time'])
-        
-        # Create a list for feature columns; if a key is missing, fill with zeros.
-        x_list = []
-        for key in features_sequence:
-            if key in df_features.columns:
-                x_list.append(df_features[key].to_numpy())
-            else:
-                print(f"Key {key} not in {feature_id}. Filling it with zeros.")
-                x_list.append(np.zeros(time_length))
-                
-        # Stack features so that each row is a datapoint and each column a feature.
-        # np.column_stack ensures the resulting array has shape (n_samples, len(features_sequence))
-        x = np.column_stack(x_list)
-        
-        # Load target CSV and extract the 'target' column
-        y = pd.read_csv(target_file)['target'].to_numpy()
-        
-        # Append this file's data to the overall lists
-        all_x_test.append(x)
-        all_y_test.append(y)
-
-    for feature_id in mini_test_list:
-        # Build full file paths
-        feature_file = features_dir / feature_id
-        target_file = targets_dir / feature_id
-        
-        # Load features CSV
-        df_features = pd.read_csv(feature_file)
-        time_length = len(df_features['time'])
-        
-        # Create a list for feature columns; if a key is missing, fill with zeros.
-        x_list = []
-        for key in features_sequence:
-            if key in df_features.columns:
-                x_list.append(df_features[key].to_numpy())
-            else:
-                print(f"Key {key} not in {feature_id}. Filling it with zeros.")
-                x_list.append(np.zeros(time_length))
-                
-        # Stack features so that each row is a datapoint and each column a feature.
-        # np.column_stack ensures the resulting array has shape (n_samples, len(features_sequence))
-        x = np.column_stack(x_list)
-        
-        # Load target CSV and extract the 'target' column
-        y = pd.read_csv(target_file)['target'].to_numpy()
-        
-        # Append this file's data to the overall lists
-        all_x_mini_test.append(x)
-        all_y_mini_test.append(y)
+    def load_split(file_ids, executor):
+        # executor.map keeps the order of the file list
+        xs, ys = [], []
+        for x, y in executor.map(load_file, file_ids):
+            # Append this file's data to the split's lists
+            xs.append(x)
+            ys.append(y)
+        return np.vstack(xs), np.concatenate(ys)
 
-    all_x_train = np.vstack(all_x_train)
-    all_y_train = np.concatenate(all_y_train)
-    all_x_test = np.vstack(all_x_test)
-    all_y_test = np.concatenate(all_y_test)
-    all_x_mini_test = np.vstack(all_x_mini_test)
-    all_y_mini_test = np.concatenate(all_y_mini_test)
+    # The files are independent and the CSV parsing releases the GIL, so they are loaded in a thread pool
+    # shared by the three splits.
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        all_x_train, all_y_train = load_split(train_list, executor)
+        all_x_test, all_y_test = load_split(test_list, executor)
+        all_x_mini_test, all_y_mini_test = load_split(mini_test_list, executor)
 
-    return all_x_train, all_y_train, all_x_test, all_y_test, all_x_mini_test, all_y_mini_test
\ No newline at end of file
+    return all_x_train, all_y_train, all_x_test, all_y_test, all_x_mini_test, all_y_mini_test
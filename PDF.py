@@ -5,13 +5,13 @@ import matplotlib.pyplot as plt
 
 def clean_data(pd_series):
     """
-    Cleans the input pandas Series by removing any NaN values.
+    Cleans the input pandas Series by removing any NaN or infinite values.
 
     Args:
         pd_series: pandas Series or list-like object containing numerical data.
 
     Returns:
-        cleaned_array: NumPy array of the input data with NaN values removed.
+        cleaned_array: NumPy array of the input data with NaN and +-inf values removed.
 
     Example:
         import pandas as pd
@@ -20,8 +20,14 @@ def clean_data(pd_series):
         print(cleaned_data)
         # Output: array([1.0, 2.0, 3.0, 4.0])
     """
-    series_array = np.array(pd_series)
-    return series_array[~np.isnan(series_array)]
+    # View the data as an array (no copy if it already is one)
+    series_array = np.asarray(pd_series)
+    finite = np.isfinite(series_array)
+    
+    # Clean columns are the common case, skip the gather copy for them
+    if finite.all():
+        return series_array
+    return series_array[finite]
 
 
 def PDF(y, plot=False, norm=False):
@@ -42,18 +48,32 @@ def PDF(y, plot=False, norm=False):
         >>> ((array([0.33333333, 0.33333333, 0.33333333]),array([1.33333333, 2.        , 2.66666667])),1)
     """
     
-    # Convert data to array without nans
-    if type(y[0])!=float:
-        y = clean_data(y)
+    # Convert data to array without nans and infs (a single finite mask, no copy if the data is already clean)
+    y = clean_data(y)
     
-    # Compute the histogram for the given values
-    hist, bin_edges = np.histogram(y, bins='auto')
+    # Compute the histogram on uniform bins, so numpy can use its fast scale-and-cast binning
+    # instead of searching through the bin edges. The number of bins is computed once here like bins='auto' does:
+    # the larger of Sturges' rule and the Freedman-Diaconis rule (bin width 2*IQR/n^(1/3)).
+    if y.size == 0:
+        # No finite values: a single empty bin on [0, 1], like np.histogram(y, bins='auto') returns
+        ymin, ymax, nbins = 0.0, 1.0, 1
+    else:
+        ymin, ymax = y.min(), y.max()
+        nbins = int(np.ceil(np.log2(len(y)) + 1))
+        q25, q75 = np.percentile(y, [25, 75])
+        fd_width = 2 * (q75 - q25) * len(y) ** (-1 / 3)
+        if fd_width > 0:
+            nbins = max(nbins, int(np.ceil((ymax - ymin) / fd_width)))
+    if ymin == ymax:
+        # Degenerate range: let numpy widen it by +-0.5 around the single value
+        ymin, ymax = ymin - 0.5, ymax + 0.5
+    hist, _ = np.histogram(y, bins=nbins, range=(ymin, ymax))
     
     # Normalising histogram
     hist = hist/len(y)
     
-    # Calculate the bin centers for the x-axis (midpoints of bin edges)
-    bin_centers = (bin_edges[:-1] + bin_edges[1:]) / 2
+    # Calculate the bin centers for the x-axis directly from the uniform bin width
+    bin_centers = ymin + (np.arange(nbins) + 0.5) * (ymax - ymin) / nbins
     
     scaling=1
     
@@ -73,6 +93,41 @@ def PDF(y, plot=False, norm=False):
 
 import numpy as np
 
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional, the NumPy version below is used without it
+    njit = None
+
+
+def _closest_indices_numpy(t, cuts):
+    """
+    Returns for every cut point the index of the closest value in t (first one on ties), without assuming t is sorted.
+    """
+    return np.array([np.abs(t - cut).argmin() for cut in cuts], dtype=np.int64)
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _closest_indices(t, cuts):
+        """
+        Numba version of _closest_indices_numpy: a plain scan per cut point, without an N-length temporary.
+        """
+        out = np.empty(cuts.size, np.int64)
+        for k in prange(cuts.size):
+            cut = cuts[k]
+            best = 0
+            best_dist = abs(t[0] - cut)
+            for i in range(1, t.size):
+                dist = abs(t[i] - cut)
+                if dist < best_dist:
+                    best_dist = dist
+                    best = i
+            out[k] = best
+        return out
+else:
+    _closest_indices = _closest_indices_numpy
+
+
 def Edward(y, t, t_c):
     """
     Cuts the function values y into corresponding pieces at given time points, approximating
@@ -95,36 +150,37 @@ def Edward(y, t, t_c):
         >>> [[1, 1, 1], [2, 2, 2, 2, 3], [3, 3]], [[1, 2, 3], [4, 5, 6, 7, 8], [9, 10]]
     """
     
-    # Ensure inputs are numpy arrays
-    t_array = t.to_numpy()
-    y = y.to_numpy()
-    t_c_array = np.array(t_c)
-
-    # Initialize the lists for storing cut segments
-    y_cutted = []
-    t_cutted = []
-    
-    # Initial index to start slicing from
-    start_idx = 0
+    # Ensure inputs are numpy arrays (y and t may be pandas Series or plain array-likes)
+    t_array = np.asarray(t)
+    y = np.asarray(y)
+    t_c_array = np.asarray(t_c)
+
+    # Check if any cut point is outside the range of t
+    out_of_bounds = (t_c_array < t_array[0]) | (t_c_array > t_array[-1])
+    if out_of_bounds.any():
+        raise ValueError(f"Cut point {t_c_array[out_of_bounds][0]} is out of bounds for t.")
     
-    for cut_point in t_c_array:
-        # Check if cut_point is outside the range of t
-        if cut_point < t_array[0] or cut_point > t_array[-1]:
-            raise ValueError(f"Cut point {cut_point} is out of bounds for t.")
-        
-        # Find the index of the closest value in t to the cut point
-        closest_idx = (np.abs(t_array - cut_point)).argmin()
-        
-        # Append the segment up to the closest index
-        y_cutted.append(y[start_idx:closest_idx + 1])
-        t_cutted.append(t[start_idx:closest_idx + 1])
-        
-        # Update the start index
-        start_idx = closest_idx + 1
+    if np.all(t_array[1:] >= t_array[:-1]):
+        # Find the index of the closest value in t to every cut point at once, using that t is sorted.
+        # searchsorted gives the first index with t >= cut point, so the closest one is it or its left neighbour.
+        right_idx = np.searchsorted(t_array, t_c_array)
+        left_idx = np.maximum(right_idx - 1, 0)
+        right_idx = np.minimum(right_idx, len(t_array) - 1)
+        left_closer = (t_c_array - t_array[left_idx]) <= (t_array[right_idx] - t_c_array)
+        closest_idx = np.where(left_closer, left_idx, right_idx)
+    else:
+        # Unsorted timestamps need a full scan per cut point
+        closest_idx = _closest_indices(t_array.astype(np.float64), t_c_array.astype(np.float64))
     
-    # Add the final segment after the last cut point
-    y_cutted.append(y[start_idx:])
-    t_cutted.append(t[start_idx:])
+    # Each segment ends at (and includes) the closest index of its cut point
+    split_idx = closest_idx + 1
+    y_cutted = np.split(y, split_idx)
+    if hasattr(t, 'iloc'):
+        # Keep the index of a pandas Series in its pieces
+        bounds = np.concatenate(([0], split_idx, [len(t_array)]))
+        t_cutted = [t.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+    else:
+        t_cutted = np.split(t_array, split_idx)
     
     return y_cutted, t_cutted
 
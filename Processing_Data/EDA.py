@@ -1,20 +1,218 @@
 import numpy as np
-from scipy.stats import gaussian_kde
 import pandas as pd
 import numpy as np
-from scipy.integrate import simps  # For numerical integration
+from scipy.signal import fftconvolve
 import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import repeat
 
-def compute_feature_statistics(dataframes, RE_valid, features):
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional, the NumPy version below is used without it
+    njit = None
+
+try:
+    import jax
+    import jax.numpy as jnp
+except ImportError:  # JAX is optional, it is only needed for backend='jax'
+    jax = None
+
+
+def _scott_bandwidth(values):
+    """
+    Kernel bandwidth by Scott's rule, the default of scipy.stats.gaussian_kde.
+    """
+    n = values.size
+    h = np.std(values, ddof=1) * n ** (-1 / 5) if n > 1 else 0.0
+    if not h > 0:
+        raise ValueError("Cannot estimate a density from samples with zero variance.")
+    return h
+
+
+def _kde_eval_numpy(samples, x, h):
+    """
+    Sums the Gaussian kernels of all samples at every point of x, in blocks of samples to bound the temporary array.
+    """
+    out = np.zeros(x.size)
+    for start in range(0, samples.size, 4096):
+        d = (x[:, None] - samples[None, start:start + 4096]) / h
+        out += np.exp(-0.5 * d * d).sum(axis=1)
+    return out / (samples.size * h * np.sqrt(2 * np.pi))
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _kde_eval(samples, x, h):
+        """
+        Numba version of _kde_eval_numpy: one fused exp-and-sum loop per grid point, in parallel over the grid.
+        """
+        out = np.empty(x.size)
+        norm = samples.size * h * np.sqrt(2 * np.pi)
+        for i in prange(x.size):
+            xi = x[i]
+            acc = 0.0
+            for a in range(samples.size):
+                d = (xi - samples[a]) / h
+                acc += np.exp(-0.5 * d * d)
+            out[i] = acc / norm
+        return out
+else:
+    _kde_eval = _kde_eval_numpy
+
+
+if jax is not None:
+    @jax.jit
+    def _kde_eval_jax(samples, weights, x, h):
+        """
+        JAX version of the unnormalized kernel sum of _kde_eval_numpy, run on JAX's default device (the GPU if there is one).
+        XLA fuses the outer difference, the exp and the sum into one reduction without materializing the (M, N) matrix.
+        Padded samples have zero weight.
+        """
+        d = (x[:, None] - samples[None, :]) / h
+        return (weights[None, :] * jnp.exp(-0.5 * d * d)).sum(axis=1)
+
+
+def kde_eval(values, x, backend='cpu'):
+    """
+    Exact Gaussian kernel density estimate of values at the points x, the same result as scipy.stats.gaussian_kde.
+    Compiled with Numba if it is installed. Costs O(N * M), use fft_kde for large N on an evenly spaced grid.
+
+    Parameters:
+    - values (array-like): 1D array of samples.
+    - x (np.ndarray): Evaluation points.
+    - backend (str): 'cpu' for the Numba (or NumPy) kernel, 'jax' to evaluate it with JAX, e.g. on a GPU.
+      JAX computes in float32 unless jax_enable_x64 is set.
+
+    Returns:
+    - y (np.ndarray): Density estimate at x.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    h = _scott_bandwidth(values)
+    if backend == 'cpu':
+        return _kde_eval(values, x, h)
+    if backend != 'jax':
+        raise ValueError(f"Unknown backend '{backend}', expected 'cpu' or 'jax'.")
+    if jax is None:
+        raise ImportError("backend='jax' requires JAX to be installed.")
+    
+    # Pad the samples to the next power of two with zero weights, so shots of similar length
+    # share one compiled kernel instead of triggering a recompilation for every length
+    n = values.size
+    padded = np.full(1 << int(np.ceil(np.log2(n))), values[0])
+    padded[:n] = values
+    weights = np.zeros(padded.size)
+    weights[:n] = 1.0
+    y = _kde_eval_jax(jax.device_put(padded), jax.device_put(weights), jax.device_put(x), h)
+    return np.asarray(y, dtype=np.float64) / (n * h * np.sqrt(2 * np.pi))
+
+
+def fft_kde(values, x):
+    """
+    Gaussian kernel density estimate of values, evaluated on the evenly spaced grid x.
+
+    The samples are binned onto the grid and the histogram is convolved with a discretized Gaussian kernel via FFT,
+    which costs O((N + M) log M) for N samples and M grid points instead of the O(N * M) of scipy.stats.gaussian_kde.
+    The bandwidth follows Scott's rule like gaussian_kde. Samples outside the grid are ignored.
+
+    Parameters:
+    - values (array-like): 1D array of samples.
+    - x (np.ndarray): Evenly spaced, increasing grid of evaluation points.
+
+    Returns:
+    - y (np.ndarray): Density estimate at x.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.size
+    sigma = _scott_bandwidth(values)
+
+    # Bin the samples onto the grid: bin i is centered on x[i]
+    dx = x[1] - x[0]
+    edges = np.concatenate(([x[0] - dx / 2], x + dx / 2))
+    hist, _ = np.histogram(values, bins=edges)
+
+    # Discretized Gaussian kernel over all grid offsets, normalized to unit integral
+    t = np.arange(-(len(x) - 1), len(x)) * dx
+    kernel = np.exp(-0.5 * (t / sigma) ** 2)
+    kernel /= kernel.sum() * dx
+
+    # Convolution of the histogram with the kernel gives the density at the bin centers
+    return np.clip(fftconvolve(hist, kernel, mode='same'), 0, None) / n
+
+def _feature_density(feature, columns, extrema, kde, max_samples=None):
+    """
+    Estimates the density of one feature in every DataFrame, normalizes each estimate and averages them.
+
+    Parameters:
+    - feature (str): Name of the feature, used in the messages.
+    - columns (dict): The feature's values as NumPy arrays, keyed by DataFrame identifier.
+    - extrema (tuple): Min and max value of the feature over all DataFrames.
+    - kde (callable): Density estimator called as kde(values, x), fft_kde or kde_eval.
+    - max_samples (int, optional): Columns with more values are randomly subsampled to this size before the KDE.
+
+    Returns:
+    - [x, y]: The x-values (range) and the averaged, normalized density function.
+    """
+    # Retrieve the min and max values for the feature
+    min_val, max_val = extrema
+
+    # Generate x-values over the feature's range for evaluation, shared by all DataFrames
+    x = np.linspace(min_val, max_val, 1000) if min_val is not None else np.empty(0)
+
+    # Grid spacing for the normalization
+    dx = x[1] - x[0] if x.size > 1 else 0.0
+
+    # Running sum of the estimated densities, so only one grid-sized array is kept
+    density_sum = np.zeros_like(x)
+    n_valid = 0
+
+    for RE_key, values in columns.items():
+        try:
+            # The KDE cost grows linearly with the number of samples, while a large random subsample
+            # barely changes a smooth density; the bandwidth is computed from the subsample.
+            if max_samples is not None and values.size > max_samples:
+                values = np.random.default_rng(0).choice(values, max_samples, replace=False)
+
+            # Compute the KDE for the feature values on the generated x-values
+            y = kde(values, x)
+
+            # Normalize the KDE values so that the integral sums to 1. The estimate already integrates to about 1,
+            # only the mass beyond the grid is missing, so the rectangle rule (a single sum) is accurate enough.
+            integral = y.sum() * dx
+            if integral > 0:  # Avoid division by zero
+                y *= 1.0 / integral
+
+            # Add the normalized density estimate to the sum
+            density_sum += y
+            n_valid += 1
+        except Exception as e:
+            print(f"Error processing feature '{feature}' in DataFrame '{RE_key}': {e}")
+            continue  # Skip this DataFrame and proceed to the next one
+
+    # Return the averaged, normalized density function over all DataFrames for the feature
+    if n_valid:  # Ensure there are estimates before averaging
+        return [x, density_sum / n_valid]
+    print(f"Warning: No valid density estimates for feature '{feature}'")
+    return [x, np.zeros_like(x)]  # Default to zero if no data available
+
+
+def compute_feature_statistics(dataframes, RE_valid, features, exact=False, backend='cpu', max_samples=None, num_workers=None):
     """
     Computes the minimum and maximum values (extrema) for each feature across multiple DataFrames.
-    Additionally, estimates the probability density function (PDF) using Kernel Density Estimation (KDE) 
+    Additionally, estimates the probability density function (PDF) using Kernel Density Estimation (KDE, see fft_kde)
     and normalizes each density function before averaging.
 
     Parameters:
     - dataframes (dict): A dictionary where keys are identifiers and values are pandas DataFrames.
     - RE_valid (list): A list of keys corresponding to DataFrames that should be considered for analysis.
     - features (list): A list of feature names (column names) to analyze.
+    - exact (bool): Evaluate the KDE exactly with kde_eval instead of the binned FFT approximation fft_kde.
+    - backend (str): 'jax' evaluates the exact KDE with JAX (on the GPU if available) and implies exact=True.
+    - max_samples (int, optional): Estimate each density from a random subsample of at most this many values
+      (e.g. 5000), mostly useful with the exact KDE. By default all values are used.
+    - num_workers (int, optional): Number of threads estimating the densities of the features concurrently.
+      Defaults to the ThreadPoolExecutor default. Not used by the Numba version of kde_eval, which is parallel itself.
 
     Returns:
     - features_extrema (dict): A dictionary containing the min and max values for each feature.
@@ -28,70 +226,58 @@ def compute_feature_statistics(dataframes, RE_valid, features):
     # Dictionary to store the min and max values of each feature across all valid DataFrames
     features_extrema = {}
 
+    # Feature columns as NumPy arrays, converted once in the extrema pass and reused by the KDE pass
+    columns = {feature: {} for feature in features}
+
     # Compute the extrema for each feature
     for feature in features:
-        temp = []  # Temporary list to store feature values from different DataFrames
+        # Running min and max, so the columns are reduced one by one instead of being concatenated first
+        min_val, max_val = np.inf, -np.inf
+        found = False
         
         for RE_key in RE_valid:
             try:
                 if len(dataframes[RE_key][feature]) == 0:
                     print(f"DataFrame '{RE_key}' is empty for feature '{feature}'.")
                     continue
-                # Extract the feature values as a NumPy array and append to temp
+                # Extract the feature values as a NumPy array (no copy for numeric columns)
                 values = dataframes[RE_key][feature].to_numpy()
-                if values.size > 0:  # Ensure the array is not empty
-                    temp.append(values)
+                columns[feature][RE_key] = values
+                min_val = np.minimum(min_val, values.min())
+                max_val = np.maximum(max_val, values.max())
+                found = True
             except Exception as e:
                 print(f"Error processing feature '{feature}' in DataFrame '{RE_key}': {e}")
                 continue  # Skip this DataFrame and proceed to the next one
 
-        # Ensure temp is not empty before computing min and max
-        if temp:
-            # Flatten temp into a single array
-            temp_flat = np.concatenate([arr for arr in temp if arr.size > 0])
-            features_extrema[feature] = (np.min(temp_flat), np.max(temp_flat))
+        if found:
+            features_extrema[feature] = (min_val, max_val)
         else:
             print(f"Warning: No valid data for feature '{feature}'")
             features_extrema[feature] = (None, None)  # Handle case where no data is available
 
-    # Dictionary to store the density estimates for each feature
-    features_densities = {}
-
-    # Compute the Kernel Density Estimation (KDE) for each feature
-    for feature in features:
-        temp = []  # Temporary list to store estimated densities
-
-        # Retrieve the min and max values for the feature
-        min_val, max_val = features_extrema[feature]
-
-        for RE_key in RE_valid:
-            try:
-                # Compute the KDE for the feature values
-                kde = gaussian_kde(dataframes[RE_key][feature].to_numpy())
-                
-                # Generate x-values over the feature's range for evaluation
-                x = np.linspace(min_val, max_val, 1000)
-
-                # Evaluate the KDE on the generated x-values
-                y = kde(x)
-
-                # Normalize the KDE values so that the integral sums to 1
-                integral = simps(y, x)  # Compute numerical integration using Simpson’s rule
-                if integral > 0:  # Avoid division by zero
-                    y /= integral
-
-                # Store the normalized density estimate
-                temp.append(y)
-            except Exception as e:
-                print(f"Error processing feature '{feature}' in DataFrame '{RE_key}': {e}")
-                continue  # Skip this DataFrame and proceed to the next one
-
-        # Store the averaged, normalized density function over all DataFrames for the feature
-        if temp:  # Ensure temp is not empty before averaging
-            features_densities[feature] = [x, np.mean(np.array(temp), axis=0)]
-        else:
-            print(f"Warning: No valid density estimates for feature '{feature}'")
-            features_densities[feature] = [x, np.zeros_like(x)]  # Default to zero if no data available
+    # The features are independent, so their densities are estimated concurrently.
+    # NumPy and the FFT release the GIL, so threads scale without copying the columns to processes.
+    if backend == 'jax':
+        if jax is None:
+            raise ImportError("backend='jax' requires JAX to be installed.")
+        kde = partial(kde_eval, backend='jax')
+    else:
+        kde = kde_eval if exact else fft_kde
+    feature_columns = [columns[feature] for feature in features]
+    feature_extrema = [features_extrema[feature] for feature in features]
+    if kde is kde_eval and njit is not None:
+        # The Numba kernel is already parallel over the grid, and its threading layer has to be
+        # launched from the calling thread, so the features are processed one after another here.
+        densities = map(_feature_density, features, feature_columns, feature_extrema, repeat(kde), repeat(max_samples))
+        # Dictionary to store the density estimates for each feature
+        features_densities = dict(zip(features, densities))
+    else:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            densities = executor.map(_feature_density, features, feature_columns, feature_extrema, repeat(kde),
+                                     repeat(max_samples))
+            # Dictionary to store the density estimates for each feature
+            features_densities = dict(zip(features, densities))
 
     return features_extrema, features_densities
 
@@ -99,6 +285,22 @@ def compute_feature_statistics(dataframes, RE_valid, features):
 # Function to check for NaNs and Infs in a dictionary of DataFrames
 import numpy as np
 
+def _count_nans_infs(df):
+    """
+    Counts the NaNs and Infs of a numeric DataFrame in one pass over its values.
+    
+    Returns:
+    - nans (int): Number of NaN values.
+    - infs (int): Number of +-Inf values.
+    """
+    # Only numeric columns can hold NaNs and Infs; a single-dtype frame converts to one array without a copy
+    numeric = df if all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes) else df.select_dtypes('number')
+    values = numeric.to_numpy(dtype=np.float64, copy=False)
+    # A single finite check flags both; the few non-finite values are then split into NaNs and Infs
+    non_finite = values[~np.isfinite(values)]
+    nans = int(np.isnan(non_finite).sum())
+    return nans, non_finite.size - nans
+
 def check_nans_infs(dataframes):
     """
     Checks each DataFrame in the given dictionary for NaN (Not a Number)
@@ -114,11 +316,8 @@ def check_nans_infs(dataframes):
     
     # Iterate over each DataFrame in the dictionary
     for key, df in dataframes.items():
-        # Count the total number of NaNs in the DataFrame
-        nans = df.isna().sum().sum()
-        
-        # Count the total number of Infs in the DataFrame
-        infs = np.isinf(df).sum().sum()
+        # Count the total number of NaNs and Infs in the DataFrame
+        nans, infs = _count_nans_infs(df)
         
         # If the DataFrame contains NaNs, replace them with zeros and print a message
         if nans > 0:
@@ -144,11 +343,8 @@ def check_nans_infs_pdf(dataframes, drop=True):
     
     # Iterate over each DataFrame in the dictionary
     for key, df in dataframes.items():
-        # Count the total number of NaNs in the DataFrame
-        nans = df.isna().sum().sum()
-        
-        # Count the total number of Infs in the DataFrame
-        infs = np.isinf(df).sum().sum()
+        # Count the total number of NaNs and Infs in the DataFrame
+        nans, infs = _count_nans_infs(df)
         
         # If the DataFrame contains NaNs, replace them with zeros and print a message
         if nans > 0:
@@ -166,7 +362,23 @@ def check_nans_infs_pdf(dataframes, drop=True):
 
 
 
-def plot_jet_data(RE_DICT: pd.DataFrame, NO_RE_DICT: pd.DataFrame, save_path: str, x_lim_re=None, x_lim_no_re=None):
+def _downsample_for_plot(time, signal, max_points=5000):
+    """
+    Reduces a time series to at most max_points points for plotting by averaging consecutive blocks of samples.
+    More points than that cannot be resolved on screen but still have to be processed by matplotlib.
+    """
+    time = np.asarray(time, dtype=np.float64)
+    signal = np.asarray(signal, dtype=np.float64)
+    if time.size <= max_points:
+        return time, signal
+
+    # Start index of each block, then the mean of every block in one reduction
+    starts = np.linspace(0, time.size, max_points, endpoint=False).astype(np.intp)
+    counts = np.diff(np.append(starts, time.size))
+    return np.add.reduceat(time, starts) / counts, np.add.reduceat(signal, starts) / counts
+
+
+def plot_jet_data(RE_DICT: pd.DataFrame, NO_RE_DICT: pd.DataFrame, save_path: str, x_lim_re=None, x_lim_no_re=None, max_points=5000):
     """
     Plots plasma parameters for RE and NO-RE cases from given DataFrames.
     
@@ -176,6 +388,7 @@ def plot_jet_data(RE_DICT: pd.DataFrame, NO_RE_DICT: pd.DataFrame, save_path: st
     save_path (str): File path to save the plot as SVG.
     x_lim_re (tuple): Limits for x-axis for RE plots (min, max).
     x_lim_no_re (tuple): Limits for x-axis for NO-RE plots (min, max).
+    max_points (int): Longer time series are averaged down to this many points before plotting.
     """
     keys_jet = ['IPLA', 'WMHD', 'RNT', 'DAI_EDG7', 'SSXcore'] #, 'DAO_EDG7'
     units = ['A', 'J', 'Counts', 'p/s/cm²/sr', 'p/s/cm²/sr', 'W/m$^2$']
@@ -184,8 +397,8 @@ def plot_jet_data(RE_DICT: pd.DataFrame, NO_RE_DICT: pd.DataFrame, save_path: st
     fig, axes = plt.subplots(len(keys_jet), 2, figsize=(8, 8))
     
     for n, key in enumerate(keys_jet):
-        axes[n, 0].plot(RE_DICT['time'], RE_DICT[key], label='RE')
-        axes[n, 1].plot(NO_RE_DICT['time'], NO_RE_DICT[key], label='NO-RE')
+        axes[n, 0].plot(*_downsample_for_plot(RE_DICT['time'], RE_DICT[key], max_points), label='RE')
+        axes[n, 1].plot(*_downsample_for_plot(NO_RE_DICT['time'], NO_RE_DICT[key], max_points), label='NO-RE')
         
         # Set x-limits
         if x_lim_re:
@@ -1,8 +1,120 @@
 import os
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from functools import partial
 
-def load_and_process_data(base_path, re_autom_path, re_valid_path, check_nans_infs):
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pv
+    import pyarrow.parquet as pq
+except ImportError:  # PyArrow is optional, pandas' C parser is used without it
+    pv = None
+    pq = None
+
+try:
+    import h5py
+except ImportError:  # h5py is optional, it is only needed for h5_path in save_*_targets
+    h5py = None
+
+
+def _read_shot_csv(file_path, feature_dtype=None):
+    """
+    Reads the CSV file of one shot and returns its shot number together with the DataFrame.
+    If feature_dtype is given, the float columns except 'time' are converted to it.
+    """
+    file = os.path.basename(file_path)
+    shot_nr = int(file.split('.')[0].split('no')[1])
+    if pv is not None:
+        # Parse with Arrow's multithreaded reader and convert the columns on the Arrow table,
+        # so pandas receives them in their final dtype without an intermediate float64 copy
+        table = pv.read_csv(file_path)
+        if feature_dtype is not None:
+            arrow_dtype = pa.from_numpy_dtype(np.dtype(feature_dtype))
+            table = table.cast(pa.schema([
+                field.with_type(arrow_dtype) if field.name != 'time' and pa.types.is_floating(field.type) else field
+                for field in table.schema]))
+        return shot_nr, table.to_pandas()
+
+    df = pd.read_csv(file_path)
+    if feature_dtype is not None:
+        df = df.astype({key: feature_dtype for key in df.columns
+                        if key != 'time' and pd.api.types.is_float_dtype(df[key])})
+    return shot_nr, df
+
+
+def _read_shot_time(file_path):
+    """
+    Reads only the 'time' column of the CSV file of one shot as a NumPy array.
+    """
+    if pv is None:
+        return pd.read_csv(file_path, usecols=['time'])['time'].to_numpy()
+    table = pv.read_csv(file_path, convert_options=pv.ConvertOptions(include_columns=['time']))
+    return table.column('time').to_numpy()
+
+
+def _write_target_csv(file_path, time, target):
+    """
+    Writes the time and target arrays of one shot to a CSV file with the columns 'time' and 'target'.
+    """
+    if pv is None:
+        pd.DataFrame({'time': time, 'target': target}).to_csv(file_path, index=False)
+        return
+    # Arrow quotes the header by default, so the plain header is written first and only the rows by Arrow
+    with open(file_path, 'wb') as f:
+        f.write(b'time,target\n')
+        pv.write_csv(pa.table({'time': time, 'target': target}), f, pv.WriteOptions(include_header=False))
+
+
+def _open_targets_parquet(parquet_path):
+    """
+    Opens a Parquet writer for the targets of many shots in one table with the columns 'shot', 'time' and 'target'.
+    The 0/1 target is stored as int8 and, like the constant shot column, shrinks to almost nothing
+    with the run-length encoding and zstd compression.
+    """
+    if pq is None:
+        raise ImportError("Saving the targets to Parquet requires pyarrow.")
+    schema = pa.schema([('shot', pa.int32()), ('time', pa.float64()), ('target', pa.int8())])
+    return pq.ParquetWriter(parquet_path, schema, compression='zstd')
+
+
+def _write_targets_parquet(writer, shot_nr, time, target):
+    """
+    Appends the targets of one shot to an open Parquet writer as one row group.
+    """
+    writer.write_table(pa.table({'shot': np.full(len(time), int(shot_nr), dtype=np.int32),
+                                 'time': time, 'target': np.asarray(target, dtype=np.int8)}, schema=writer.schema))
+
+
+def _write_targets_h5(h5_file, shot_nr, time, target):
+    """
+    Writes the targets of one shot to an open HDF5 file as the group '<shot_nr>' with the datasets 'time' and 'target'.
+    """
+    group = h5_file.create_group(str(shot_nr))
+    group.create_dataset('time', data=time, compression='lzf')
+    group.create_dataset('target', data=np.asarray(target, dtype=np.uint8), compression='gzip', compression_opts=1)
+
+
+def _open_targets_file(parquet_path=None, h5_path=None):
+    """
+    Opens the single output file for the targets of many shots.
+
+    Returns a function appending the targets of one shot (shot_nr, time, target) and a function closing the file,
+    or None if neither path is given (one CSV per shot is written then).
+    """
+    if parquet_path is not None:
+        writer = _open_targets_parquet(parquet_path)
+        return partial(_write_targets_parquet, writer), writer.close
+    if h5_path is not None:
+        if h5py is None:
+            raise ImportError("Saving the targets to HDF5 requires h5py.")
+        h5_file = h5py.File(h5_path, 'w')
+        return partial(_write_targets_h5, h5_file), h5_file.close
+    return None
+
+
+def load_and_process_data(base_path, re_autom_path, re_valid_path, check_nans_infs, num_workers=None, feature_dtype=np.float32):
     """
     Loads CSV files into a dictionary, filters RE shot lists, and extracts feature names.
 
@@ -11,6 +123,10 @@ def load_and_process_data(base_path, re_autom_path, re_valid_path, check_nans_in
     - re_autom_path (str): Path to the automatic RE numbers CSV file.
     - re_valid_path (str): Path to the validated RE numbers CSV file.
     - check_nans_infs (function): Function to check and drop NaNs/Infs.
+    - num_workers (int, optional): Number of threads reading the CSV files concurrently. Defaults to the ThreadPoolExecutor default.
+    - feature_dtype (dtype, optional): Dtype the float feature columns are converted to after parsing (float32 by default,
+                                       which halves the memory of the loaded shots). The 'time' column keeps float64.
+                                       None keeps the parsed dtypes.
 
     Returns:
     - dataframes (dict): Dictionary with shot numbers as keys and dataframes as values.
@@ -20,11 +136,14 @@ def load_and_process_data(base_path, re_autom_path, re_valid_path, check_nans_in
     - features (list): List of feature names (excluding 'time').
     """
 
-    # Load all CSV files into a dictionary with shot numbers as keys
-    dataframes = {
-        int(file.split('.')[0].split('no')[1]): pd.read_csv(os.path.join(base_path, file))
-        for file in os.listdir(base_path)
-    }
+    # Load all CSV files into a dictionary with shot numbers as keys.
+    # The files are independent and the parsing releases the GIL, so they are read in a thread pool
+    # (executor.map keeps the order of the directory listing).
+    # os.scandir yields the full paths and file types directly from the directory listing.
+    with os.scandir(base_path) as entries:
+        files = [entry.path for entry in entries if entry.name.endswith('.csv') and entry.is_file()]
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        dataframes = dict(executor.map(_read_shot_csv, files, repeat(feature_dtype)))
 
     # Load RE shot lists
     RE_autom = list(pd.read_csv(re_autom_path, header=None)[0])
@@ -33,10 +152,12 @@ def load_and_process_data(base_path, re_autom_path, re_valid_path, check_nans_in
     # Check and clean NaNs/Infs
     check_nans_infs(dataframes)
 
-    # Update shot lists to include only those present in dataframes
+    # Update shot lists to include only those present in dataframes (dict lookups are O(1))
     RE_autom = [shot for shot in RE_autom if shot in dataframes]
     RE_valid = [shot for shot in RE_valid if shot in dataframes]
-    NO_RE_probably = [shot for shot in dataframes if shot not in RE_autom and shot not in RE_valid]
+    # Check membership in a set of all RE shots instead of scanning both lists for every shot
+    RE_shots = set(RE_autom) | set(RE_valid)
+    NO_RE_probably = [shot for shot in dataframes if shot not in RE_shots]
 
     # Extract feature names (excluding 'time')
     features = list(dataframes[NO_RE_probably[0]].keys()) if NO_RE_probably else []
@@ -46,7 +167,104 @@ def load_and_process_data(base_path, re_autom_path, re_valid_path, check_nans_in
     return dataframes, RE_autom, RE_valid, NO_RE_probably, features
 
 
-def save_re_targets(RE_lifetimes, base_path_re, save_path_targets):
+def stack_shots(dataframes, features):
+    """
+    Stacks the shots of a dataframes dictionary into contiguous arrays with one row per timestep of all shots,
+    so per-feature operations run on one array instead of looping over the DataFrames.
+
+    Parameters:
+    - dataframes (dict): Dictionary with shot numbers as keys and dataframes as values (from load_and_process_data).
+    - features (list): List of feature names to stack. Features missing in a shot are filled with NaN.
+
+    Returns:
+    - stacked (dict): Dictionary with
+        - 'shot_id': int32 array with the shot number of every row.
+        - 'time': float64 array with the time of every row.
+        - 'features': float32 array of shape (rows, len(features)).
+        - 'offsets': Dictionary mapping each shot number to the (start, end) rows of the shot.
+    """
+    total = sum(len(df) for df in dataframes.values())
+    shot_id = np.empty(total, dtype=np.int32)
+    time = np.empty(total, dtype=np.float64)
+    X = np.empty((total, len(features)), dtype=np.float32)
+    offsets = {}
+
+    start = 0
+    for shot_nr, df in dataframes.items():
+        end = start + len(df)
+        shot_id[start:end] = shot_nr
+        time[start:end] = df['time'].to_numpy()
+        X[start:end] = df.reindex(columns=features).to_numpy(dtype=np.float32)
+        offsets[shot_nr] = (start, end)
+        start = end
+
+    return {'shot_id': shot_id, 'time': time, 'features': X, 'offsets': offsets}
+
+
+def _shot_time(shot_nr, base_path, dataframes):
+    """
+    Returns the time array of one shot, from the already loaded dataframes if the shot is in there,
+    otherwise read from the CSV file in base_path.
+    """
+    if dataframes is not None and int(shot_nr) in dataframes:
+        return dataframes[int(shot_nr)]['time'].to_numpy()
+    return _read_shot_time(os.path.join(base_path, f'JETno{shot_nr}.csv'))
+
+
+def _runaway_mask(time, lifetimes):
+    """
+    Boolean mask of the timesteps strictly inside any of the runaway lifetime intervals.
+
+    lifetimes is a single (start, end) pair or a list of pairs. The intervals are sorted by start, so the last
+    interval starting before each timestep is found with one searchsorted, and the running maximum of the ends
+    tells whether any interval starting before that timestep is still open.
+    """
+    intervals = np.asarray(lifetimes, dtype=np.float64).reshape(-1, 2)
+    intervals = intervals[np.argsort(intervals[:, 0], kind='stable')]
+    open_until = np.maximum.accumulate(intervals[:, 1])
+    k = np.searchsorted(intervals[:, 0], time, side='left') - 1
+    return (k >= 0) & (time < open_until[np.maximum(k, 0)])
+
+
+def _save_re_target(shot_nr, lifetimes, base_path_re, save_path_targets, dataframes=None):
+    """
+    Creates and saves the target of one runaway positive shot (no CSV is written if save_path_targets is None).
+    Returns the time and target arrays, or None if the shot could not be processed.
+    """
+    # Load the time of the shot
+    try:
+        time = _shot_time(shot_nr, base_path_re, dataframes)
+        
+        target = np.zeros(len(time), dtype=np.uint8)
+        target[_runaway_mask(time, lifetimes)]=1
+
+        # Save to CSV immediately
+        if save_path_targets is not None:
+            _write_target_csv(os.path.join(save_path_targets, f"JETno{shot_nr}.csv"), time, target)
+        return time, target
+    except:
+        print(f"Error in saving target for shot {shot_nr}")
+        return None
+
+
+def _save_no_re_target(shot_nr, base_path, save_path_targets, dataframes=None):
+    """
+    Creates and saves the all-zero target of one runaway negative shot (no CSV is written if save_path_targets is None).
+    Returns the time and target arrays.
+    """
+    # Load the time of the shot
+    time = _shot_time(shot_nr, base_path, dataframes)
+
+    target = np.zeros(len(time), dtype=np.uint8)
+
+    # Save to CSV
+    if save_path_targets is not None:
+        _write_target_csv(os.path.join(save_path_targets, f"JETno{shot_nr}.csv"), time, target)
+    return time, target
+
+
+def save_re_targets(RE_lifetimes, base_path_re, save_path_targets, num_workers=None, dataframes=None, parquet_path=None,
+                    h5_path=None):
     '''
     Creates targets for training in a network later on. All timesteps that are within the runaway time window will be set to 1, those outside to 0.
 
@@ -55,43 +273,57 @@ def save_re_targets(RE_lifetimes, base_path_re, save_path_targets):
                            If each shot has multiple lifetime intervals, it should be a list of tuples [(start1, end1), (start2, end2), ...].
     - base_path_re (str): Path to the folder containing the CSV files with the shot parameters, including those in RE_lifetimes.
     - save_path_targets (str): Path where the targets should be saved as csv.
+    - num_workers (int, optional): Number of threads processing shots concurrently. Defaults to the ThreadPoolExecutor default.
+    - dataframes (dict, optional): Dataframes returned by load_and_process_data. The time of shots found in there
+                                   is taken from them instead of reading the CSV file again.
+    - parquet_path (str, optional): If given, the targets of all shots are written to this single Parquet file
+                                    (columns 'shot', 'time', 'target', one row group per shot) instead of one CSV
+                                    per shot in save_path_targets. Requires pyarrow.
+    - h5_path (str, optional): If given (and parquet_path is not), the targets of all shots are written to this single
+                               HDF5 file instead, one group per shot with compressed 'time' and 'target' datasets.
+                               Requires h5py.
 
     Returns:
     - targets (dict): Dictionary where:
         - Keys: Shot numbers (same as in RE_lifetimes).
-        - Values: NumPy arrays (binary masks, same length as the time series of each shot).
+        - Values: uint8 NumPy arrays (binary masks, same length as the time series of each shot).
                   Each element is 1 if the timestep is within any runaway phase, otherwise 0.
     '''
 
-    # Ensure that the save path exists
-    os.makedirs(save_path_targets, exist_ok=True)
+    # Either one Parquet or HDF5 file for all shots, or ensure that the save path for the CSV files exists
+    output_file = _open_targets_file(parquet_path, h5_path)
+    if output_file is not None:
+        write_targets, close_output = output_file
+        save_path_targets = None
+    else:
+        os.makedirs(save_path_targets, exist_ok=True)
 
     targets = {}
     non_existing_shots = []
 
-    for shot_nr, lifetimes in RE_lifetimes.items():
-        # Load CSV file
-        try:
-            file_path = os.path.join(base_path_re, f'JETno{shot_nr}.csv')
-            data = pd.read_csv(file_path)
-            time = data['time']  # Convert to NumPy array for efficiency
-            
-            target = np.zeros(len(time))
-
-            # Store target in dictionary
-            target[(time>lifetimes[0]) & (time<lifetimes[1])]=1
-            targets[shot_nr] = np.copy(target)
-
-            # Save to CSV immediately
-            df = pd.DataFrame({'time': time, 'target': np.copy(target)})
-            df.to_csv(os.path.join(save_path_targets, f"JETno{shot_nr}.csv"), index=False)
-        except:
-            print(f"Error in saving target for shot {shot_nr}")
-            non_existing_shots.append(shot_nr)
+    # Every shot reads and writes its own files, and the CSV parsing and writing release the GIL,
+    # so the shots are processed in a thread pool (executor.map keeps the order of RE_lifetimes).
+    # The Parquet and HDF5 writers are not thread-safe, so the shots are appended here in the calling thread.
+    shot_numbers = list(RE_lifetimes)
+    try:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            results = executor.map(_save_re_target, shot_numbers, [RE_lifetimes[shot] for shot in shot_numbers],
+                                   repeat(base_path_re), repeat(save_path_targets), repeat(dataframes))
+            for shot_nr, result in zip(shot_numbers, results):
+                if result is None:
+                    non_existing_shots.append(shot_nr)
+                    continue
+                time, targets[shot_nr] = result
+                if output_file is not None:
+                    write_targets(shot_nr, time, targets[shot_nr])
+    finally:
+        if output_file is not None:
+            close_output()
 
     return targets, non_existing_shots
 
-def save_no_re_targets(NO_RE_numbers, base_path, save_path_targets):
+def save_no_re_targets(NO_RE_numbers, base_path, save_path_targets, num_workers=None, dataframes=None, parquet_path=None,
+                       h5_path=None):
     '''
     Creates targets for training in a network later on. All timesteps in the target will be set to 0, because we assume that no re are present in the data.
 
@@ -99,31 +331,38 @@ def save_no_re_targets(NO_RE_numbers, base_path, save_path_targets):
     - NO_RE_numbers (list or array-like): Array with shot numbers of runaway negative shots.
     - base_path (str): Path to the folder containing the CSV files with the shot parameters.
     - save_path_targets (str): Path where the targets should be saved as csv.
+    - num_workers (int, optional): Number of threads processing shots concurrently. Defaults to the ThreadPoolExecutor default.
+    - dataframes (dict, optional): Dataframes returned by load_and_process_data, used like in save_re_targets.
+    - parquet_path (str, optional): Single Parquet file for the targets of all shots, like in save_re_targets.
+    - h5_path (str, optional): Single HDF5 file for the targets of all shots, like in save_re_targets.
 
     Returns:
     - targets (dict): Dictionary where:
         - Keys: Shot numbers (same as in NO_RE_numbers).
-        - Values: Array with zeros, the same length as the corresponding time array of the shot
+        - Values: uint8 array with zeros, the same length as the corresponding time array of the shot
     '''
 
-    # Ensure save path exists
-    os.makedirs(save_path_targets, exist_ok=True)
+    # Either one Parquet or HDF5 file for all shots, or ensure that the save path for the CSV files exists
+    output_file = _open_targets_file(parquet_path, h5_path)
+    if output_file is not None:
+        write_targets, close_output = output_file
+        save_path_targets = None
+    else:
+        os.makedirs(save_path_targets, exist_ok=True)
 
     targets = {}
 
-    for shot_nr in NO_RE_numbers:
-        # Load CSV file
-        file_path = os.path.join(base_path, f'JETno{shot_nr}.csv')
-        data = pd.read_csv(file_path)
-        time = data['time'].values  # Convert to NumPy array for efficiency
-
-        target = np.zeros(len(time))
-
-        # Store target in dictionary
-        targets[shot_nr] = target
-
-        # Save to CSV
-        df = pd.DataFrame({'time': time, 'target': target})
-        df.to_csv(os.path.join(save_path_targets, f"JETno{shot_nr}.csv"), index=False)
+    # Shots are independent, so they are processed in a thread pool like in save_re_targets
+    shot_numbers = list(NO_RE_numbers)
+    try:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            results = executor.map(_save_no_re_target, shot_numbers, repeat(base_path), repeat(save_path_targets),
+                                   repeat(dataframes))
+            for shot_nr, (time, targets[shot_nr]) in zip(shot_numbers, results):
+                if output_file is not None:
+                    write_targets(shot_nr, time, targets[shot_nr])
+    finally:
+        if output_file is not None:
+            close_output()
 
-    return targets
\ No newline at end of file
+    return targets
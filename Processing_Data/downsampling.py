@@ -1,24 +1,99 @@
 import numpy as np
 import pandas as pd
 
-def downsample_timeseries(begin_time, end_time, time_series, signal_series, length=1000):
-    # Create a DataFrame from the time and signal series
-    df = pd.DataFrame({'time': time_series, 'signal': signal_series})
+try:
+    from numba import njit
+except ImportError:  # Numba is optional, the NumPy version below is used without it
+    njit = None
+
+
+def _bin_mean_numpy(time, signal, edges):
+    """
+    Mean of the signal in the bins between the given edges, NaN for empty bins.
+    """
+    length = edges.size - 1
+    begin_time, end_time = edges[0], edges[-1]
+    # Filter the arrays for the given time range
+    in_range = (time >= begin_time) & (time <= end_time)
+    time = time[in_range]
+    signal = signal[in_range]
     
-    # Filter the DataFrame for the given time range
-    df = df[(df['time'] >= begin_time) & (df['time'] <= end_time)]
+    # Assign each time value to its bin by a binary search over the edges, exactly like
+    # pd.cut(..., include_lowest=True): the bins are closed on the right and the first one includes begin_time
+    bin_idx = np.clip(np.searchsorted(edges, time, side='left') - 1, 0, length - 1)
     
-    # Generate a consistent time axis using linspace
-    downsampled_time = np.linspace(begin_time, end_time, length)
+    # Mean of each bin from per-bin sums and counts, skipping NaNs like the pandas mean does;
+    # bins without samples are NaN so the result stays aligned with the time axis
+    valid = ~np.isnan(signal)
+    sums = np.bincount(bin_idx[valid], weights=signal[valid], minlength=length)
+    counts = np.bincount(bin_idx[valid], minlength=length).astype(np.float64)
+    return np.divide(sums, counts, out=np.full(length, np.nan), where=counts > 0)
+
+
+if njit is not None:
+    # No fastmath: the bin index has to be resolved exactly against the edges
+    @njit(cache=True, boundscheck=False)
+    def _bin_mean(time, signal, edges):
+        """
+        Numba version of _bin_mean_numpy: masking, binning and accumulation fused into one pass over the signal.
+        
+        The bins are nearly uniform, so the bin of a sample is first estimated from its time and then corrected
+        against the actual edges, which gives the same bins as the binary search.
+        """
+        length = edges.size - 1
+        begin_time = edges[0]
+        end_time = edges[length]
+        scale = length / (end_time - begin_time)
+        sums = np.zeros(length)
+        counts = np.zeros(length)
+        for i in range(time.size):
+            t = time[i]
+            s = signal[i]
+            if t >= begin_time and t <= end_time and not np.isnan(s):
+                k = int((t - begin_time) * scale)
+                k = min(max(k, 0), length - 1)
+                # Right-closed bins (edges[k], edges[k + 1]], the first one including begin_time
+                while k > 0 and t <= edges[k]:
+                    k -= 1
+                while k < length - 1 and t > edges[k + 1]:
+                    k += 1
+                sums[k] += s
+                counts[k] += 1.0
+        out = np.empty(length)
+        for k in range(length):
+            out[k] = sums[k] / counts[k] if counts[k] > 0 else np.nan
+        return out
+else:
+    _bin_mean = _bin_mean_numpy
+
+
+def downsample_timeseries(begin_time, end_time, time_series, signal_series, length=1000):
+    """
+    Downsamples a timeseries to length points by averaging the signal in equal-width time bins.
     
-    # Create bins for the time intervals
-    bins = np.linspace(begin_time, end_time, length + 1)
+    The bins are the grouped aggregation pandas' resample/groupby would do, computed directly from the bin index
+    of every sample (a Numba loop if available, np.searchsorted and np.bincount otherwise), without building a DataFrame.
     
-    # Assign each time value to a bin
-    df['bin'] = pd.cut(df['time'], bins, labels=False, include_lowest=True)
+    Parameters:
+    - begin_time: Start time of the downsampled range.
+    - end_time: End time of the downsampled range.
+    - time_series: Array of time points from the original data.
+    - signal_series: Corresponding signal values.
+    - length: Number of bins (and points of the new time axis).
     
-    # Group by the bins and calculate the mean for each bin
-    downsampled_signal = df.groupby('bin')['signal'].mean().values
+    Returns:
+    - downsampled_time: Evenly spaced time axis of length points between begin_time and end_time.
+    - downsampled_signal: Mean of the signal in every bin (NaNs are skipped), NaN for bins without samples.
+    """
+    # Convert the time and signal series to contiguous NumPy arrays
+    time = np.ascontiguousarray(time_series, dtype=np.float64)
+    signal = np.ascontiguousarray(signal_series, dtype=np.float64)
+    
+    # Generate a consistent time axis using linspace
+    downsampled_time = np.linspace(begin_time, end_time, length)
+    # The bin edges are computed by NumPy for both kernels, so they are the same edges pd.cut would use
+    edges = np.linspace(begin_time, end_time, length + 1)
+    downsampled_signal = _bin_mean(time, signal, edges)
     
     return downsampled_time, downsampled_signal
 
@@ -26,25 +101,18 @@ def downsample_and_merge(shot, length=1000, keys= ['SSXcore', 'IP', 'DAO_EDG7',
 
     # Extract the time range for the shot
     t_b, t_e = shot['Ramp_up'][0], shot['Ramp_down'][1]
-    # Initialize an empty DataFrame for the merged result
-    merged_df = pd.DataFrame()
+    # All keys share the same time axis, so their downsampled signals are filled into the columns of one array
+    t_grid = np.linspace(t_b, t_e, length)
+    out = np.empty((length, len(keys)), dtype=np.float64)
     
-    for key in keys:
+    for j, key in enumerate(keys):
         # Check if the timeseries is empty
         if len(shot[key]['time']) == 0 or len(shot[key]['signal']) == 0:
-            downsampled_time = np.linspace(t_b, t_e, length)
-            downsampled_signal = np.zeros(length)
+            out[:, j] = 0.0
         else:
             # Downsample the timeseries for the current key
-            downsampled_time, downsampled_signal = downsample_timeseries(t_b, t_e, shot[key]['time'], shot[key]['signal'], length)
-        
-        # Create a DataFrame for the downsampled data
-        downsampled_df = pd.DataFrame({'time': downsampled_time, key: downsampled_signal})
-        
-        # Merge with the existing merged DataFrame
-        if merged_df.empty:
-            merged_df = downsampled_df
-        else:
-            merged_df = pd.merge(merged_df, downsampled_df, on='time', how='inner')
+            _, out[:, j] = downsample_timeseries(t_b, t_e, shot[key]['time'], shot[key]['signal'], length)
     
-    return merged_df
\ No newline at end of file
+    merged_df = pd.DataFrame(out, columns=keys)
+    merged_df.insert(0, 'time', t_grid)
+    return merged_df
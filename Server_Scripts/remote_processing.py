@@ -1,22 +1,62 @@
 import os
+import re
+import json
 from scipy.io import loadmat
 import h5py
-import cPickle as pickle
+try:
+    import cPickle as pickle  # Python 2
+except ImportError:  # Python 3
+    import pickle
 import numpy as np
 import tempfile
 import shutil
 import random
+import multiprocessing
+
+try:
+    from os import scandir
+except ImportError:  # os.scandir is not available on Python 2, os.listdir is used there
+    scandir = None
+
+# Protocol of the aggregated pickle file: runs under Python 2 and Python 3 append to the same file,
+# so its records must stay readable by Python 2 (which reads up to protocol 2)
+PICKLE_PROTOCOL = 2
+
+# dtype of the MATLAB cell/struct arrays, created once instead of on every comparison
+_OBJ_DTYPE = np.dtype(object)
 
 def convert_to_standard_format(data):
     """
     Recursively convert nested arrays with dtype=object to standard NumPy arrays or lists,
     and flatten them.
+    Object arrays are walked with an explicit stack and their leaves are concatenated once
+    into a flat array, instead of building a new array on every nesting level.
     """
-    if isinstance(data, np.ndarray) and data.dtype == np.object:
-        return np.array([convert_to_standard_format(item) for item in data]).flatten()
-    elif isinstance(data, (list, tuple)):
+    t = type(data)
+    if t is np.ndarray and data.dtype == _OBJ_DTYPE:
+        # Common case for MATLAB payloads: object arrays wrapping a single numeric array,
+        # which is unwrapped and returned as a flat view without any copy
+        while data.size == 1 and type(data.flat[0]) is np.ndarray:
+            if data.flat[0].dtype != _OBJ_DTYPE:
+                return data.flat[0].ravel()
+            data = data.flat[0]
+
+        leaves = []
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            t = type(item)
+            # Children are pushed in reverse, so the leaves are collected in their original order
+            if t is np.ndarray and item.dtype == _OBJ_DTYPE:
+                stack.extend(item.ravel()[::-1])
+            elif t is list or t is tuple:
+                stack.extend(item[::-1])
+            else:
+                leaves.append(np.ravel(item))
+        return np.concatenate(leaves) if leaves else np.array([])
+    elif t is list or t is tuple:
         return [convert_to_standard_format(item) for item in data]
-    elif isinstance(data, dict):
+    elif t is dict:
         return {key: convert_to_standard_format(value) for key, value in data.items()}
     else:
         return data
@@ -31,8 +71,13 @@ def process_mat_file(file_path):
     Returns:
         dict: The processed data.
     """
+    # MATLAB v7.3 files are HDF5 files, which are read directly with h5py
+    if h5py.is_hdf5(file_path):
+        return process_h5_file(file_path)
+
     try:
-        mat_contents = loadmat(file_path)
+        # Only the variables used below are decoded, the rest of the file is skipped
+        mat_contents = loadmat(file_path, variable_names=['SIG', 'objDIS', 'Discharge'])
         processed_data = {}
 
         # Extract the necessary data from the .mat file
@@ -87,7 +132,10 @@ def process_h5_file(file_path):
     """
     processed_data = {}
 
-    with h5py.File(file_path, 'r') as h5_file:
+    # A larger chunk cache (128 MiB instead of 1 MiB) keeps the chunks of large chunked/compressed
+    # signals in memory instead of decompressing them again
+    with h5py.File(file_path, 'r', rdcc_nbytes=128 * 1024 ** 2, rdcc_nslots=50000, rdcc_w0=0.5) as h5_file:
+        shared_time = None
         keys_jet = ['IP', 'WMHD', 'RNT', 'DAO_EDG7', 'SSXcore']
         for key in keys_jet:
             if key in h5_file['SIG']:
@@ -95,10 +143,15 @@ def process_h5_file(file_path):
                 if 'time' in signal_data:
                     time_data = signal_data['time'][:]
                 else:
-                    time_data = h5_file['SIG']['time'][:]
+                    # The shared time axis is read once and reused for all signals without their own one
+                    if shared_time is None:
+                        shared_time = h5_file['SIG']['time'][:]
+                    time_data = shared_time
+                # h5py reads plain numeric arrays, so they are only flattened (as views of the freshly read data);
+                # signals sharing the time axis share its memory
                 processed_data[key] = {
-                    'signal': convert_to_standard_format(signal_data['signal'][:]).flatten(),
-                    'time': convert_to_standard_format(time_data).flatten()
+                    'signal': signal_data['signal'][:].ravel(),
+                    'time': time_data.ravel()
                 }
 
         # Check for the presence of additional keys in the .h5 file
@@ -109,7 +162,7 @@ def process_h5_file(file_path):
                 additional_keys = ['Ramp_up', 'Flat_top', 'Ramp_down']
                 for key in additional_keys:
                     if key in h5_file['objDIS']['Discharge']:
-                        processed_data[key] = convert_to_standard_format(h5_file['objDIS']['Discharge'][key][:].flatten())
+                        processed_data[key] = h5_file['objDIS']['Discharge'][key][:].flatten()
                     else:
                         print("Key {} not found in h5_file['objDIS']['Discharge']".format(key))
 
@@ -129,29 +182,135 @@ def save_to_pickle(data, file_name):
     temp_file = tempfile.NamedTemporaryFile(delete=False)
     try:
         with open(temp_file.name, 'wb') as pickle_file:
-            pickle.dump(data, pickle_file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, pickle_file, protocol=PICKLE_PROTOCOL)
         shutil.move(temp_file.name, file_name)
         print("Data saved to {}".format(file_name))
     finally:
         if os.path.exists(temp_file.name):
             os.remove(temp_file.name)
 
+def append_to_pickle(shot_number, data, file_name):
+    """
+    Appends the processed data of one shot to a Pickle file as a (shot_number, data) record,
+    so only the new shot is written instead of the whole aggregated dictionary.
+
+    Parameters:
+        shot_number (str): The shot the data belongs to.
+        data (dict): The processed data of the shot.
+        file_name (str): The name of the Pickle file.
+    """
+    with open(file_name, 'ab') as pickle_file:
+        pickle.dump((shot_number, data), pickle_file, protocol=PICKLE_PROTOCOL)
+
 def load_existing_data(file_name):
     """
     Loads existing data from a Pickle file if it exists.
 
+    The file is a sequence of records: (shot_number, data) tuples written by append_to_pickle,
+    possibly preceded by a whole dictionary written by save_to_pickle.
+
     Parameters:
         file_name (str): The name of the Pickle file.
 
     Returns:
         dict: The loaded data, or an empty dictionary if the file does not exist.
     """
+    all_data = {}
     if os.path.exists(file_name):
         with open(file_name, 'rb') as pickle_file:
-            return pickle.load(pickle_file)
-    return {}
+            while True:
+                end_of_records = pickle_file.tell()
+                try:
+                    record = pickle.load(pickle_file)
+                except EOFError:
+                    break
+                except pickle.UnpicklingError as e:
+                    # Python 3 reports a record that ends early as truncated instead of EOFError
+                    if 'truncated' not in str(e):
+                        raise
+                    break
+                if isinstance(record, dict):
+                    all_data.update(record)
+                else:
+                    all_data[record[0]] = record[1]
+        # Only the last record can run into the end of the file: it was cut off by an interrupted run and is removed,
+        # so new records are appended after the last complete one (that shot is simply processed again).
+        # Any other error (a corrupt record, an unsupported protocol) is raised above without touching the file
+        if end_of_records < os.path.getsize(file_name):
+            with open(file_name, 'r+b') as pickle_file:
+                pickle_file.truncate(end_of_records)
+    return all_data
+
+# File names containing 'JET' and ending in .mat or .h5
+JET_FILE = re.compile(r'JET.*\.(mat|h5)$')
+# Index of the JET files of the database directory, reused by all scripts while the directory is unchanged
+JET_FILES_CACHE = '/tmp/jet_files.json'
+
+def scan_jet_files(remote_path):
+    """
+    Lists the names of the JET .mat and .h5 files in a directory.
+    """
+    if scandir is None:
+        return [name for name in os.listdir(remote_path) if JET_FILE.search(name)]
+    # The directory entries already carry their file type
+    return [entry.name for entry in scandir(remote_path) if JET_FILE.search(entry.name) and entry.is_file()]
+
+def list_jet_files(remote_path, cache_path=JET_FILES_CACHE):
+    """
+    Lists the JET .mat and .h5 files in a directory.
+    The file names are stored in a JSON index together with the modification time of the directory,
+    and the index is reused instead of listing the (network mounted) directory again until files
+    are added, removed or renamed there.
+
+    Parameters:
+        remote_path (str): The directory containing the files.
+        cache_path (str): Path of the JSON index (no index is used if None).
+
+    Returns:
+        list: (file name, file path) tuples of the JET files.
+    """
+    mtime = os.stat(remote_path).st_mtime
+    names = None
+    if cache_path is not None and os.path.exists(cache_path):
+        try:
+            with open(cache_path) as f:
+                index = json.load(f)
+            if index['path'] == remote_path and index['mtime'] == mtime:
+                names = [str(name) for name in index['files']]
+        except (IOError, OSError, ValueError, KeyError):
+            names = None  # Unreadable index, the directory is listed again
+
+    if names is None:
+        names = scan_jet_files(remote_path)
+        if cache_path is not None:
+            try:
+                with open(cache_path, 'w') as f:
+                    json.dump({'path': remote_path, 'mtime': mtime, 'files': names}, f)
+            except (IOError, OSError) as e:
+                print("Could not write the file index {}: {}".format(cache_path, e))
+
+    return [(name, os.path.join(remote_path, name)) for name in names]
+
+def process_shot(shot):
+    """
+    Processes the file of one shot in a worker process.
 
-def main():
+    Parameters:
+        shot (tuple): The shot number and the path to its .mat or .h5 file.
+
+    Returns:
+        tuple: The shot number and its processed data.
+    """
+    shot_number, file_path = shot
+    print("Processing file: {}".format(file_path))
+
+    if file_path.endswith('.mat'):
+        processed_data = process_mat_file(file_path)
+    else:
+        processed_data = process_h5_file(file_path)
+    return shot_number, processed_data
+
+def main(num_workers=None):
     remote_path = "/Lac8_D/DEFUSE/DEFUSE_DB/DB_mat/"
     pickle_file_name = "all_JET_data.pkl"
     
@@ -159,35 +318,34 @@ def main():
     all_data = load_existing_data(os.path.join('/home/tost/NoTivoli/'+ pickle_file_name))
     processed_shots = set(all_data.keys())
 
-    # List all files in the remote directory
-    remote_files = os.listdir(remote_path)
-
-    # Filter files to include only JET .mat and .h5 files
-    jet_files = [file for file in remote_files if 'JET' in file and (file.endswith('.mat') or file.endswith('.h5'))]
+    # List the JET .mat and .h5 files in the remote directory
+    jet_files = list_jet_files(remote_path)
 
     # random.shuffle(jet_files)  # Shuffle the list to get a statistical value
     # jet_files = jet_files[:40]  # Limit the number of files to process for testing
 
-    for file_name in jet_files:
+    todo = []
+    for file_name, file_path in jet_files:
         shot_number = file_name.split('.')[0]  # Extract shot number from file name
         if shot_number in processed_shots:
             print("Skipping already processed file: {}".format(file_name))
             continue
+        todo.append((shot_number, file_path))
 
-        file_path = os.path.join(remote_path, file_name)
-        print("Processing file: {}".format(file_path))
-
-        if file_name.endswith('.mat'):
-            processed_data = process_mat_file(file_path)
-        elif file_name.endswith('.h5'):
-            processed_data = process_h5_file(file_path)
-
-        all_data[shot_number] = processed_data
+    # The files are independent, so they are parsed in a pool of worker processes (one per CPU by default).
+    # The results are appended to the Pickle file here in the main process, in the order they finish.
+    pool = multiprocessing.Pool(processes=num_workers)
+    try:
+        for shot_number, processed_data in pool.imap_unordered(process_shot, todo):
+            all_data[shot_number] = processed_data
 
-        # Save the aggregated data to a single Pickle file after each file is processed
-        save_to_pickle(all_data, os.path.join('/home/tost/NoTivoli/'+ pickle_file_name))
+            # Append the shot to the aggregated Pickle file after each file is processed
+            append_to_pickle(shot_number, processed_data, os.path.join('/home/tost/NoTivoli/'+ pickle_file_name))
+    finally:
+        pool.close()
+        pool.join()
 
     print("Aggregated Pickle file created: {}".format(pickle_file_name))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
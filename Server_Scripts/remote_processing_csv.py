@@ -1,4 +1,6 @@
 import os
+import re
+import json
 import numpy as np
 import pandas as pd
 import random
@@ -8,17 +10,55 @@ import pickle
 import tempfile
 import shutil
 from scipy.ndimage import gaussian_filter1d
+import multiprocessing
+from functools import partial
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pv
+except ImportError:  # PyArrow is optional (and not available on Python 2), pandas' CSV writer is used without it
+    pv = None
+
+try:
+    from os import scandir
+except ImportError:  # os.scandir is not available on Python 2, os.listdir is used there
+    scandir = None
+
+# dtype of the MATLAB cell/struct arrays, created once instead of on every comparison
+_OBJ_DTYPE = np.dtype(object)
 
 def convert_to_standard_format(data):
     """
     Recursively convert nested arrays with dtype=object to standard NumPy arrays or lists,
     and flatten them.
+    Object arrays are walked with an explicit stack and their leaves are concatenated once
+    into a flat array, instead of building a new array on every nesting level.
     """
-    if isinstance(data, np.ndarray) and data.dtype == object:
-        return np.array([convert_to_standard_format(item) for item in data]).flatten()
-    elif isinstance(data, (list, tuple)):
+    t = type(data)
+    if t is np.ndarray and data.dtype == _OBJ_DTYPE:
+        # Common case for MATLAB payloads: object arrays wrapping a single numeric array,
+        # which is unwrapped and returned as a flat view without any copy
+        while data.size == 1 and type(data.flat[0]) is np.ndarray:
+            if data.flat[0].dtype != _OBJ_DTYPE:
+                return data.flat[0].ravel()
+            data = data.flat[0]
+
+        leaves = []
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            t = type(item)
+            # Children are pushed in reverse, so the leaves are collected in their original order
+            if t is np.ndarray and item.dtype == _OBJ_DTYPE:
+                stack.extend(item.ravel()[::-1])
+            elif t is list or t is tuple:
+                stack.extend(item[::-1])
+            else:
+                leaves.append(np.ravel(item))
+        return np.concatenate(leaves) if leaves else np.array([])
+    elif t is list or t is tuple:
         return [convert_to_standard_format(item) for item in data]
-    elif isinstance(data, dict):
+    elif t is dict:
         return {key: convert_to_standard_format(value) for key, value in data.items()}
     else:
         return data
@@ -33,8 +73,13 @@ def process_mat_file(file_path):
     Returns:
         dict: The processed data.
     """
+    # MATLAB v7.3 files are HDF5 files, which are read directly with h5py
+    if h5py.is_hdf5(file_path):
+        return process_h5_file(file_path)
+
     try:
-        mat_contents = loadmat(file_path)
+        # Only the variables used below are decoded, the rest of the file is skipped
+        mat_contents = loadmat(file_path, variable_names=['SIG', 'objDIS', 'Discharge'])
         processed_data = {}
 
         # Extract the necessary data from the .mat file
@@ -86,7 +131,10 @@ def process_h5_file(file_path):
     """
     processed_data = {}
 
-    with h5py.File(file_path, 'r') as h5_file:
+    # A larger chunk cache (128 MiB instead of 1 MiB) keeps the chunks of large chunked/compressed
+    # signals in memory instead of decompressing them again
+    with h5py.File(file_path, 'r', rdcc_nbytes=128 * 1024 ** 2, rdcc_nslots=50000, rdcc_w0=0.5) as h5_file:
+        shared_time = None
         keys_jet = ['IPLA', 'WMHD', 'RNT', 'DAO_EDG7', 'SSXcore', 'DAI_EDG7', 'ECE_PF']
         for key in keys_jet:
             if key in h5_file['SIG']:
@@ -94,10 +142,15 @@ def process_h5_file(file_path):
                 if 'time' in signal_data:
                     time_data = signal_data['time'][:]
                 else:
-                    time_data = h5_file['SIG']['time'][:]
+                    # The shared time axis is read once and reused for all signals without their own one
+                    if shared_time is None:
+                        shared_time = h5_file['SIG']['time'][:]
+                    time_data = shared_time
+                # h5py reads plain numeric arrays, so they are only flattened (as views of the freshly read data);
+                # signals sharing the time axis share its memory
                 processed_data[key] = {
-                    'signal': convert_to_standard_format(signal_data['signal'][:]).flatten(),
-                    'time': convert_to_standard_format(time_data).flatten()
+                    'signal': signal_data['signal'][:].ravel(),
+                    'time': time_data.ravel()
                 }
 
         if 'objDIS' in h5_file:
@@ -112,7 +165,7 @@ def process_h5_file(file_path):
 
     return processed_data
 
-def downsample_timeseries(begin_time, end_time, time_series, signal_series, timestep_size=1e-3, sigma=2):
+def downsample_timeseries(begin_time, end_time, time_series, signal_series, timestep_size=1e-3, sigma=2, time_grid=None, num_points=None):
     """
     Downsample a timeseries using interpolation within a specified time range.
     
@@ -123,6 +176,8 @@ def downsample_timeseries(begin_time, end_time, time_series, signal_series, time
     - signal_series: Corresponding signal values.
     - timestep_size: The desired time step between samples.
     - sigma: The standard deviation for the Gaussian filter.
+    - time_grid: Precomputed time points to interpolate at (built from begin_time, end_time and num_points if None).
+    - num_points: Number of time points, round((end_time - begin_time) / timestep_size) if None.
     
     Returns:
     - downsampled_time: New time array with fixed time step.
@@ -132,13 +187,20 @@ def downsample_timeseries(begin_time, end_time, time_series, signal_series, time
     if end_time <= begin_time:
         raise ValueError("end_time must be greater than begin_time")
 
-    # Create the new time points with fixed timestep
-    downsampled_time = np.arange(begin_time, end_time, timestep_size)
-
-    # Filter time and signal within the specified range
-    mask = (time_series >= begin_time) & (time_series <= end_time)
-    filtered_time_series = time_series[mask]
-    filtered_signal_series = signal_series[mask]
+    # Create the new time points with fixed timestep, unless a shared grid is given. np.linspace with a
+    # rounded number of points is used since the length of np.arange depends on float rounding.
+    if time_grid is None:
+        if num_points is None:
+            num_points = time_grid_size(begin_time, end_time, timestep_size)
+        time_grid = np.linspace(begin_time, end_time, num_points, endpoint=False)
+    downsampled_time = time_grid
+
+    # Filter time and signal within the specified range. The time series is increasing (np.interp below
+    # relies on that too), so the range is located with two binary searches and sliced without a mask.
+    i0 = np.searchsorted(time_series, begin_time, side='left')
+    i1 = np.searchsorted(time_series, end_time, side='right')
+    filtered_time_series = time_series[i0:i1]
+    filtered_signal_series = signal_series[i0:i1]
 
     # Handle case where no data points are in range
     if len(filtered_time_series) == 0:
@@ -153,6 +215,12 @@ def downsample_timeseries(begin_time, end_time, time_series, signal_series, time
 
     return downsampled_time, downsampled_signal
 
+def time_grid_size(begin_time, end_time, timestep_size):
+    """
+    Number of points of the time grid from begin_time (included) to end_time (excluded) with the given step.
+    """
+    return int(round((end_time - begin_time) / timestep_size))
+
 def downsample_and_merge(shot, file_name, keys=['SSXcore', 'IPLA', 'DAO_EDG7', 'WMHD', 'RNT', 'DAI_EDG7', 'ECE_PF'], timestep_size=1e-3):
     """
     Downsample and merge time-series data for a single shot.
@@ -163,35 +231,61 @@ def downsample_and_merge(shot, file_name, keys=['SSXcore', 'IPLA', 'DAO_EDG7', '
         return pd.DataFrame()
 
     t_b, t_e = shot['disr_ipla_td'] - 1, shot['disr_ipla_td'] + 5  # Start and end times with respect to disruption time
-    merged_df = pd.DataFrame()
 
-    # Generate a shared time grid
-    shared_time_grid = np.arange(t_b, t_e, timestep_size)
+    # Generate a shared time grid; all signals are interpolated onto it, so they are stacked column-wise
+    # into one array instead of merging a DataFrame per signal on 'time'
+    num_points = time_grid_size(t_b, t_e, timestep_size)
+    shared_time_grid = np.linspace(t_b, t_e, num_points, endpoint=False)
+    cols, names = [shared_time_grid], ['time']
 
     for key in keys:
         if key not in shot or len(shot[key]['time']) == 0 or len(shot[key]['signal']) == 0:
             print('Signal {} from shot {} could not be downsampled since it was not available'.format(key, file_name))
             continue
 
-        # Downsample using a fixed time grid
-        downsampled_time, downsampled_signal = downsample_timeseries(
-            t_b, t_e, shot[key]['time'], shot[key]['signal'], timestep_size=timestep_size
+        # Downsample onto the shared time grid
+        _, downsampled_signal = downsample_timeseries(
+            t_b, t_e, shot[key]['time'], shot[key]['signal'], timestep_size=timestep_size,
+            time_grid=shared_time_grid, num_points=num_points
         )
+        cols.append(downsampled_signal)
+        names.append(key)
 
-        # Create DataFrame with the shared time grid
-        downsampled_df = pd.DataFrame({'time': downsampled_time, key: downsampled_signal})
+    # No signal available: empty DataFrame, like before
+    if len(cols) == 1:
+        return pd.DataFrame()
+    # The names list keeps the column order of keys, which a dict does not on Python 2
+    return pd.DataFrame(np.column_stack(cols), columns=names)
 
-        # Merge on 'time' column
-        if merged_df.empty:
-            merged_df = downsampled_df
-        else:
-            merged_df = pd.merge(merged_df, downsampled_df, on='time', how='inner')
+def write_csv(df, output_file):
+    """
+    Writes a DataFrame of float columns to a CSV file without the index.
+    Uses PyArrow's CSV writer if it is installed, pandas otherwise.
+
+    Parameters:
+        df (pd.DataFrame): The data to write.
+        output_file (str): The path of the CSV file.
+    """
+    if pv is None:
+        df.to_csv(output_file, index=False)
+        return
+    # Arrow quotes the header by default, so the plain header is written first and only the rows by Arrow
+    with open(output_file, 'wb') as f:
+        f.write((','.join(df.columns) + '\n').encode())
+        pv.write_csv(pa.Table.from_pandas(df, preserve_index=False), f, pv.WriteOptions(include_header=False))
 
-    return merged_df
+def process_and_save_as_csv(file_path, output_folder, output_format='csv'):
+    """
+    Downsamples the signals of one shot file and saves them to output_folder.
 
-def process_and_save_as_csv(file_path, output_folder):
+    Parameters:
+        file_path (str): The path to the .mat or .h5 file of the shot.
+        output_folder (str): The folder the downsampled data is saved to.
+        output_format (str): 'csv', or 'parquet' for a Snappy-compressed Parquet file, which is several times
+                             smaller and faster to load (and lets single columns be read). Parquet requires pyarrow.
+    """
     file_name = os.path.splitext(os.path.basename(file_path))[0]
-    output_file = os.path.join(output_folder, "{}.csv".format(file_name))
+    output_file = os.path.join(output_folder, "{}.{}".format(file_name, output_format))
 
     if os.path.exists(output_file):
         print("File {} already exists. Skipping...".format(output_file))
@@ -209,12 +303,65 @@ def process_and_save_as_csv(file_path, output_folder):
         merged_df = downsample_and_merge(shot_data, file_name)
         if merged_df.empty:
             raise ValueError("")
-        merged_df.to_csv(output_file, index=False)
+        if output_format == 'parquet':
+            merged_df.to_parquet(output_file, engine='pyarrow', compression='snappy', index=False)
+        else:
+            write_csv(merged_df, output_file)
         print("Saved downsampled data of file {} to {}".format(file_path, output_file))
     except Exception as e:
         print("Failed to process {}: {}".format(file_path, e))
 
-def main():
+# File names containing 'JET' and ending in .mat or .h5
+JET_FILE = re.compile(r'JET.*\.(mat|h5)$')
+# Index of the JET files of the database directory, reused by all scripts while the directory is unchanged
+JET_FILES_CACHE = '/tmp/jet_files.json'
+
+def scan_jet_files(remote_path):
+    """
+    Lists the names of the JET .mat and .h5 files in a directory.
+    """
+    if scandir is None:
+        return [name for name in os.listdir(remote_path) if JET_FILE.search(name)]
+    # The directory entries already carry their file type
+    return [entry.name for entry in scandir(remote_path) if JET_FILE.search(entry.name) and entry.is_file()]
+
+def list_jet_files(remote_path, cache_path=JET_FILES_CACHE):
+    """
+    Lists the JET .mat and .h5 files in a directory.
+    The file names are stored in a JSON index together with the modification time of the directory,
+    and the index is reused instead of listing the (network mounted) directory again until files
+    are added, removed or renamed there.
+
+    Parameters:
+        remote_path (str): The directory containing the files.
+        cache_path (str): Path of the JSON index (no index is used if None).
+
+    Returns:
+        list: (file name, file path) tuples of the JET files.
+    """
+    mtime = os.stat(remote_path).st_mtime
+    names = None
+    if cache_path is not None and os.path.exists(cache_path):
+        try:
+            with open(cache_path) as f:
+                index = json.load(f)
+            if index['path'] == remote_path and index['mtime'] == mtime:
+                names = [str(name) for name in index['files']]
+        except (IOError, OSError, ValueError, KeyError):
+            names = None  # Unreadable index, the directory is listed again
+
+    if names is None:
+        names = scan_jet_files(remote_path)
+        if cache_path is not None:
+            try:
+                with open(cache_path, 'w') as f:
+                    json.dump({'path': remote_path, 'mtime': mtime, 'files': names}, f)
+            except (IOError, OSError) as e:
+                print("Could not write the file index {}: {}".format(cache_path, e))
+
+    return [(name, os.path.join(remote_path, name)) for name in names]
+
+def main(num_workers=None, output_format='csv'):
     remote_path = "/Lac8_D/DEFUSE/DEFUSE_DB/DB_mat/"
     output_folder = "/home/tost/NoTivoli/downsampled_csvs_nodtIP_conv"
 
@@ -222,14 +369,31 @@ def main():
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
 
-    remote_files = os.listdir(remote_path)
-    jet_files = [file for file in remote_files if 'JET' in file and (file.endswith('.mat') or file.endswith('.h5'))]
+    jet_files = list_jet_files(remote_path)
+
+    # Drop the shots whose output already exists with a single listing of the output folder,
+    # instead of one existence check per file
+    done = set(os.listdir(output_folder))
+    n_files = len(jet_files)
+    jet_files = [(file_name, file_path) for file_name, file_path in jet_files
+                 if "{}.{}".format(os.path.splitext(file_name)[0], output_format) not in done]
+    print("Skipping {} already processed files".format(n_files - len(jet_files)))
+
     # random.shuffle(jet_files)  # Shuffle the list to get a statistical value
     #jet_files = jet_files[:10]  # Limit the number of files to process for testing
 
-    for file_name in jet_files:
-        file_path = os.path.join(remote_path, file_name)
-        process_and_save_as_csv(file_path, output_folder)
+    # Every file is read, downsampled and saved independently, so the files are processed in a pool of worker
+    # processes (one per CPU by default); each worker opens its .mat/.h5 files one at a time and closes each one
+    # after reading it, so no file handles are shared between or kept open in the workers.
+    pool = multiprocessing.Pool(processes=num_workers)
+    try:
+        for _ in pool.imap_unordered(partial(process_and_save_as_csv, output_folder=output_folder,
+                                             output_format=output_format),
+                                     [file_path for _, file_path in jet_files], chunksize=4):
+            pass
+    finally:
+        pool.close()
+        pool.join()
 
 if __name__ == "__main__":
     main()
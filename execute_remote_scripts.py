@@ -2,8 +2,26 @@ import paramiko # To establish an SSH connection
 import sys
 import os
 import pickle # To store the processed data
+import numpy as np
 import matplotlib.pyplot as plt
 import shutil
+import io
+import codecs
+import select
+import socket
+import stat
+import shlex
+import tarfile
+import posixpath
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import zstandard
+    ZSTD_ERRORS = (zstandard.ZstdError,)
+except ImportError:  # zstandard is optional, files are then downloaded uncompressed
+    zstandard = None
+    ZSTD_ERRORS = ()
 sys.path.append(r'C:\Users\Max Tost\Desktop\Notebooks\SPC Neural Network Project')
 
 from PasswordLac import password as pw
@@ -13,37 +31,253 @@ port = 22
 username = "tost"
 password = pw()
 
-def execute_remote_script(script_path, remote_script_path):
+# Private key used instead of the password if it exists; loaded once, the password is tried if the key is rejected
+key_file = os.path.expanduser('~/.ssh/id_ed25519')
+try:
+    private_key = paramiko.Ed25519Key.from_private_key_file(key_file) if os.path.exists(key_file) else None
+except (paramiko.SSHException, OSError) as e:
+    print("Could not load the private key {}, using the password: {}".format(key_file, e))
+    private_key = None
+
+# SSH connections shared by all calls, keyed by (hostname, port, username) and opened on first use,
+# and the SFTP session kept open on each of them (see get_client and get_sftp)
+_clients = {}
+_sftp_sessions = {}
+_connection_lock = threading.Lock()
+# (local mtime, size) of each script at its last upload, keyed by (transport, local path, remote path),
+# so an upload is only skipped on the same connection to the same host
+_uploaded_scripts = {}
+
+def tune_transport(transport):
+    """
+    Sets up a freshly connected transport for bulk transfers: a 128 MiB window for the channels opened on it
+    (instead of 2 MiB, which limits SFTP and stream downloads to one window per round trip), no Nagle delay
+    on the small request packets, and a keepalive so the pooled connection survives idle periods.
+
+    Parameters:
+        transport (paramiko.Transport): The connected transport.
+    """
+    transport.default_window_size = 2 ** 27
+    if isinstance(transport.sock, socket.socket):  # Not the case for connections through a proxy command
+        transport.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    transport.set_keepalive(30)  # Keep the idle connection alive between calls
+
+def get_client():
+    """
+    Returns the pooled SSH client for the configured host and user, connecting only if there is
+    no active connection yet. Reusing it saves the TCP and SSH handshake on every call.
+
+    Returns:
+        paramiko.SSHClient: The connected client.
+    """
+    key = (hostname, port, username)
+    with _connection_lock:
+        ssh_client = _clients.get(key)
+        transport = ssh_client.get_transport() if ssh_client is not None else None
+        if transport is None or not transport.is_active():
+            # The scripts uploaded over the lost connection are uploaded again, the remote files may have changed since
+            for uploaded in [k for k in list(_uploaded_scripts) if k[0] is transport]:
+                del _uploaded_scripts[uploaded]
+            ssh_client = paramiko.SSHClient()
+            ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # Accept unknown host keys
+            # Connect to the remote server with the private key (if any) and the password, without searching
+            # for other keys or asking an agent first
+            ssh_client.connect(hostname, port, username, password, pkey=private_key,
+                               look_for_keys=False, allow_agent=False, compress=False,
+                               gss_auth=False, gss_kex=False)
+            tune_transport(ssh_client.get_transport())
+            _clients[key] = ssh_client
+        return ssh_client
+
+def get_sftp(ssh_client):
+    """
+    Returns the SFTP session kept open on an SSH client, opening it if needed.
+
+    Parameters:
+        ssh_client (paramiko.SSHClient): Connected client.
+
+    Returns:
+        paramiko.SFTPClient: The open SFTP session.
+    """
+    with _connection_lock:
+        sftp = _sftp_sessions.get(ssh_client)
+        if sftp is None or sftp.get_channel().closed:
+            sftp = ssh_client.open_sftp()
+            _sftp_sessions[ssh_client] = sftp
+        return sftp
+
+def close_all():
+    """
+    Closes all pooled SFTP sessions and SSH connections.
+    """
+    with _connection_lock:
+        for sftp in _sftp_sessions.values():
+            sftp.close()
+        for ssh_client in _clients.values():
+            ssh_client.close()
+        _sftp_sessions.clear()
+        _clients.clear()
+        _uploaded_scripts.clear()
+
+@functools.lru_cache(maxsize=32)
+def load_script(script_path, mtime, size):
+    """
+    Reads a script into memory. The modification time and size are part of the cache key,
+    so an edited script is read again.
+    """
+    with open(script_path, 'rb') as f:
+        return f.read()
+
+def upload_script(sftp, script_path, remote_script_path):
+    """
+    Uploads a script to the remote server, unless the same local file (same modification time and size)
+    was already uploaded to that path over the same connection.
+
+    Parameters:
+        sftp (paramiko.SFTPClient): Open SFTP session.
+        script_path (str): The local path to the Python script.
+        remote_script_path (str): The remote path where the script will be uploaded.
+    """
+    file_stat = os.stat(script_path)
+    key = (sftp.get_channel().get_transport(), os.path.abspath(script_path), remote_script_path)
+    if _uploaded_scripts.get(key) == (file_stat.st_mtime, file_stat.st_size):
+        print("{} is unchanged, skipping the upload".format(script_path))
+        return
+    # The script is sent from memory, so it is read from disk only once per version
+    data = load_script(key[1], file_stat.st_mtime, file_stat.st_size)
+    sftp.putfo(io.BytesIO(data), remote_script_path, file_size=len(data))
+    _uploaded_scripts[key] = (file_stat.st_mtime, file_stat.st_size)
+    print("Uploaded {} to {}".format(script_path, remote_script_path))
+
+def download_files(ssh_client, remote_folder, file_names, local_folder, max_workers=8):
+    """
+    Downloads files from a remote folder concurrently. Each worker thread opens its own SFTP channel
+    on the shared SSH connection, so the transfers overlap instead of waiting for each other's round trips.
+
+    Parameters:
+        ssh_client (paramiko.SSHClient): Connected client.
+        remote_folder (str): The remote folder containing the files.
+        file_names (list): Names of the files to download.
+        local_folder (str): The local folder where the files will be saved.
+        max_workers (int): Maximum number of concurrent downloads.
+    """
+    thread_data = threading.local()
+    sessions = []
+
+    def download(file_name):
+        sftp = getattr(thread_data, 'sftp', None)
+        if sftp is None:
+            sftp = thread_data.sftp = ssh_client.open_sftp()
+            sessions.append(sftp)
+        remote_file_path = remote_folder.rstrip('/') + '/' + file_name  # Remote paths are POSIX paths
+        local_file_path = os.path.join(local_folder, file_name)
+
+        print(f"Downloading {remote_file_path} to {local_file_path}")
+        sftp.get(remote_file_path, local_file_path)  # Reads ahead with pipelined requests (prefetch)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(file_names)))) as executor:
+            # Consume the results so that a failed download raises here
+            list(executor.map(download, file_names))
+    finally:
+        for sftp in sessions:
+            sftp.close()
+
+def download_folder_tar(ssh_client, remote_folder, local_folder):
+    """
+    Downloads the regular files of a remote folder (without subfolders) as a single tar stream over one
+    SSH channel, instead of opening, reading and closing every file over SFTP. The stream is zstd compressed
+    if the zstandard package is installed.
+
+    Parameters:
+        ssh_client (paramiko.SSHClient): Connected client.
+        remote_folder (str): The remote folder to be downloaded.
+        local_folder (str): The local folder where the files will be saved.
+
+    Returns:
+        bool: True if the folder was downloaded, False if tar (or zstd) failed on the server.
+    """
+    command = "cd -- {} && find . -maxdepth 1 -type f -print0 | tar --null -T - -cf -".format(shlex.quote(remote_folder))
+    if zstandard is not None:
+        command += " | zstd -q -1 -c"
+    channel = ssh_client.get_transport().open_session()
+    try:
+        # pipefail makes the exit status report a failure of any command of the pipeline
+        channel.exec_command("set -o pipefail; " + command)
+        with channel.makefile('rb') as remote_stream:
+            stream = zstandard.ZstdDecompressor().stream_reader(remote_stream) if zstandard is not None else remote_stream
+            try:
+                with tarfile.open(fileobj=stream, mode='r|') as tar:
+                    for member in tar:
+                        # Only plain files of the folder itself, so nothing is written outside the local folder
+                        name = posixpath.normpath(member.name)
+                        if member.isfile() and '/' not in name and name not in ('.', '..'):
+                            member.name = name
+                            print("Extracting {} to {}".format(name, local_folder))
+                            tar.extract(member, local_folder)
+            except (tarfile.TarError, EOFError, *ZSTD_ERRORS):
+                # No (complete) archive, e.g. tar or zstd missing on the server; the channel is closed
+                # without waiting, since the server may still be writing into it
+                return False
+        return channel.recv_exit_status() == 0
+    finally:
+        channel.close()
+
+def run_command(ssh_client, command):
+    """
+    Runs a command on the remote server and prints its stdout and stderr as they arrive.
+    Both streams are drained together from the one channel, so a command writing a lot to stderr
+    can not stall while stdout is being read.
+
+    Parameters:
+        ssh_client (paramiko.SSHClient): Connected client.
+        command (str): The command to run.
+
+    Returns:
+        int: The exit status of the command.
+    """
+    channel = ssh_client.get_transport().open_session()
+    channel.exec_command(command)
+    # Incremental decoders, since a multi-byte character can be split between two reads
+    stdout_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    stderr_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        select.select([channel], [], [], 1.0)
+        while channel.recv_ready():
+            sys.stdout.write(stdout_decoder.decode(channel.recv(32768)))
+        while channel.recv_stderr_ready():
+            sys.stderr.write(stderr_decoder.decode(channel.recv_stderr(32768)))
+        if channel.eof_received and not channel.recv_ready() and not channel.recv_stderr_ready():
+            break
+    sys.stdout.write(stdout_decoder.decode(b'', final=True))
+    sys.stderr.write(stderr_decoder.decode(b'', final=True))
+    sys.stdout.flush()
+    exit_status = channel.recv_exit_status()
+    channel.close()
+    return exit_status
+
+def execute_remote_script(script_path, remote_script_path, client=None):
     """
     Executes a Python script on the remote server and prints the output.
 
     Parameters:
         script_path (str): The local path to the Python script to be executed.
         remote_script_path (str): The remote path where the script will be uploaded.
+        client (paramiko.SSHClient, optional): Connected client to use instead of the pooled one.
+
+    Returns:
+        int: The exit status of the script, None if it could not be run.
     """
     try:
-        # Initialize an SSH client
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # Accept unknown host keys
-        ssh_client.connect(hostname, port, username, password)  # Connect to the remote server
-        
-        # Open an SFTP session
-        sftp = ssh_client.open_sftp()
-        print("SFTP session established!")
-
-        # Upload the script to the remote server
-        sftp.put(script_path, remote_script_path)
-        print(f"Uploaded {script_path} to {remote_script_path}")
-
-        # Execute the script on the remote server
-        stdin, stdout, stderr = ssh_client.exec_command(f"python {remote_script_path}")
-        print(stdout.read().decode())
-        print(stderr.read().decode())
-
-        # Close the SFTP session
-        sftp.close()
-        ssh_client.close()
-        print("SFTP session closed.")
+        # Reuse the pooled SSH connection (or the given client) and its SFTP session
+        ssh_client = client if client is not None else get_client()
+        sftp = get_sftp(ssh_client)
+
+        # Upload the script to the remote server (skipped if it is unchanged since the last upload)
+        upload_script(sftp, script_path, remote_script_path)
+
+        # Execute the script on the remote server, printing its output while it runs
+        return run_command(ssh_client, f"python {remote_script_path}")
     
     except Exception as e:
         # Handle any unexpected errors
@@ -51,7 +285,52 @@ def execute_remote_script(script_path, remote_script_path):
 
 
 
-def execute_remote_script_download(script_path, remote_script_path, remote_folder, local_folder):
+def run_many(jobs, client=None, max_sessions=8):
+    """
+    Uploads and executes several Python scripts on the remote server at the same time. Each script runs
+    in its own channel of the one SSH connection; at most max_sessions run at once, staying below the
+    server's MaxSessions limit (10 by default).
+
+    Parameters:
+        jobs (list): (script_path, remote_script_path) tuples, like the arguments of execute_remote_script.
+        client (paramiko.SSHClient, optional): Connected client to use instead of the pooled one.
+        max_sessions (int): Maximum number of scripts running at the same time.
+
+    Returns:
+        list: (exit status, stdout, stderr) of every job, in the order of jobs; stdout and stderr are strings.
+    """
+    ssh_client = client if client is not None else get_client()
+    sftp = get_sftp(ssh_client)
+    for script_path, remote_script_path in jobs:
+        upload_script(sftp, script_path, remote_script_path)
+
+    transport = ssh_client.get_transport()
+    results = [None] * len(jobs)
+    pending = list(enumerate(jobs))[::-1]
+    running = {}  # channel -> (job index, stdout bytes, stderr bytes)
+    while pending or running:
+        # Start jobs until max_sessions channels are open
+        while pending and len(running) < max_sessions:
+            i, (_, remote_script_path) = pending.pop()
+            channel = transport.open_session()
+            channel.exec_command("python {}".format(remote_script_path))
+            running[channel] = (i, bytearray(), bytearray())
+
+        # Drain all channels with data, and collect the finished ones
+        select.select(list(running), [], [], 1.0)
+        for channel in list(running):
+            i, out, err = running[channel]
+            while channel.recv_ready():
+                out += channel.recv(32768)
+            while channel.recv_stderr_ready():
+                err += channel.recv_stderr(32768)
+            if channel.eof_received and not channel.recv_ready() and not channel.recv_stderr_ready():
+                results[i] = (channel.recv_exit_status(), out.decode(errors='replace'), err.decode(errors='replace'))
+                channel.close()
+                del running[channel]
+    return results
+
+def execute_remote_script_download(script_path, remote_script_path, remote_folder, local_folder, client=None):
     """
     Executes a Python script on the remote server and retrieves the contents of a folder.
 
@@ -60,49 +339,38 @@ def execute_remote_script_download(script_path, remote_script_path, remote_folde
         remote_script_path (str): The remote path where the script will be uploaded.
         remote_folder (str): The remote folder to be downloaded.
         local_folder (str): The local folder where the contents will be saved.
+        client (paramiko.SSHClient, optional): Connected client to use instead of the pooled one.
 
     Returns:
         bool: True if the operation was successful, False otherwise.
     """
 
     try:
-        # Initialize an SSH client
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # Accept unknown host keys
-        ssh_client.connect(hostname, port, username, password)  # Connect to the remote server
-        
-        # Open an SFTP session
-        sftp = ssh_client.open_sftp()
-        print("SFTP session established!")
-
-        # Upload the script to the remote server
-        sftp.put(script_path, remote_script_path)
-        print("Uploaded {} to {}".format(script_path, remote_script_path))
-
-        # Execute the script on the remote server
-        stdin, stdout, stderr = ssh_client.exec_command("python {}".format(remote_script_path))
-        print(stdout.read().decode())
-        print(stderr.read().decode())
+        # Reuse the pooled SSH connection (or the given client) and its SFTP session
+        ssh_client = client if client is not None else get_client()
+        sftp = get_sftp(ssh_client)
+
+        # Upload the script to the remote server (skipped if it is unchanged since the last upload)
+        upload_script(sftp, script_path, remote_script_path)
+
+        # Execute the script on the remote server, printing its output while it runs
+        exit_status = run_command(ssh_client, "python {}".format(remote_script_path))
+        if exit_status != 0:
+            print("The remote script exited with status {}".format(exit_status))
 
         # Ensure the local folder exists
-        if not os.path.exists(local_folder):
-            os.makedirs(local_folder)
+        os.makedirs(local_folder, exist_ok=True)
 
         # Download the contents of the remote folder
         print(f"Downloading contents of remote folder {remote_folder} to local folder {local_folder}")
-        for file_attr in sftp.listdir_attr(remote_folder):
-            remote_file_path = os.path.join(remote_folder, file_attr.filename).replace('\\', '/')
-            local_file_path = os.path.join(local_folder, file_attr.filename)
-
-            print(f"Downloading {remote_file_path} to {local_file_path}")
-            sftp.get(remote_file_path, local_file_path)
+        # One tar stream for the whole folder if possible, otherwise the files one by one over SFTP
+        if not download_folder_tar(ssh_client, remote_folder, local_folder):
+            # listdir_attr returns the file attributes with the listing, so subfolders are skipped without extra stat calls
+            file_names = [file_attr.filename for file_attr in sftp.listdir_attr(remote_folder)
+                          if stat.S_ISREG(file_attr.st_mode)]
+            download_files(ssh_client, remote_folder, file_names, local_folder)
 
         print(f"Downloaded all files from {remote_folder} to {local_folder}")
-
-        # Close the SFTP session
-        sftp.close()
-        ssh_client.close()
-        print("SFTP session closed.")
     
     except Exception as e:
         # Handle any unexpected errors
@@ -110,20 +378,116 @@ def execute_remote_script_download(script_path, remote_script_path, remote_folde
 
 
 
-def load_pickle(file_name):
+def load_pickle(file_name, cache=True):
     """
     Loads data from a Pickle file.
 
+    The aggregated file written by Server_Scripts/remote_processing.py is a sequence of
+    (shot_number, data) records, possibly preceded by a whole dictionary; all of them are merged.
+    These records come from Python 2 (pickle protocol 2), so their NumPy arrays arrive as latin1 strings
+    that have to be decoded again; the merged data is therefore also stored as <file_name>.p5 with
+    protocol 5, in which every array is a single raw byte frame, and that file is loaded instead
+    as long as it is newer than the original.
+
     Parameters:
         file_name (str): The name of the Pickle file.
+        cache (bool): If the protocol 5 copy shall be used and written.
 
     Returns:
         dict: The loaded data.
     """
-    with open(file_name, 'rb') as pickle_file:
-        data = pickle.load(pickle_file, encoding='latin1')
+    cache_name = file_name + '.p5'
+    if cache and os.path.exists(cache_name) and os.path.getmtime(cache_name) >= os.path.getmtime(file_name):
+        try:
+            with open(cache_name, 'rb', buffering=1 << 20) as cache_file:
+                return pickle.load(cache_file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass  # Unreadable copy, the original file is loaded again
+
+    # A 1 MiB buffer lets the unpickler read the file in large blocks instead of many small reads
+    with open(file_name, 'rb', buffering=1 << 20) as pickle_file:
+        data = read_pickle_records(pickle_file)
+
+    if cache:
+        # Written to a temporary file first, so that an interrupted write never leaves a truncated copy
+        tmp_name = cache_name + '.tmp'
+        try:
+            with open(tmp_name, 'wb') as cache_file:
+                pickle.dump(data, cache_file, protocol=5)
+            os.replace(tmp_name, cache_name)
+        except OSError as e:
+            print("Could not write {}: {}".format(cache_name, e))
+    return data
+
+def read_pickle_records(pickle_file):
+    """
+    Reads the (shot_number, data) records (and whole dictionaries) of a Pickle stream one by one
+    and merges them, so only one record is unpickled at a time.
+
+    Parameters:
+        pickle_file (file-like): Binary stream positioned at the first record.
+
+    Returns:
+        dict: The merged data.
+    """
+    data = {}
+    while True:
+        try:
+            record = pickle.load(pickle_file, encoding='latin1')
+        except (EOFError, pickle.UnpicklingError):
+            # End of the file, or a record cut off while it was being written
+            break
+        if isinstance(record, dict):
+            data.update(record)
+        else:
+            data[record[0]] = record[1]
     return data
 
+def load_remote_pickle(remote_file_path, client=None):
+    """
+    Loads a Pickle file directly from the remote server, unpickling while it is downloaded
+    instead of writing it to a local file first.
+
+    Parameters:
+        remote_file_path (str): The path to the Pickle file on the remote server.
+        client (paramiko.SSHClient, optional): Connected client to use instead of the pooled one.
+
+    Returns:
+        dict: The loaded data.
+    """
+    ssh_client = client if client is not None else get_client()
+    with get_sftp(ssh_client).open(remote_file_path, 'rb', bufsize=1 << 20) as remote_file:
+        remote_file.prefetch()  # Request the whole file ahead with pipelined reads
+        return read_pickle_records(remote_file)
+
+def decimate_for_plot(time, signal, max_points=5000):
+    """
+    Reduces a signal to about max_points points for plotting. The signal is split into max_points / 2 bins
+    and the minimum and maximum of each bin are kept (in time order), so peaks stay visible in the plot.
+
+    Parameters:
+        time (np.ndarray): Time points.
+        signal (np.ndarray): Signal values at the time points.
+        max_points (int): Number of points above which the signal is reduced.
+
+    Returns:
+        tuple: The reduced time and signal arrays (the inputs if they are short enough).
+    """
+    n = min(len(time), len(signal))
+    if n <= max_points:
+        return time, signal
+    bin_size = n // (max_points // 2)
+    n_bins = n // bin_size
+    bins = signal[:n_bins * bin_size].reshape(n_bins, bin_size)
+    # A bin containing NaNs yields the NaN position, which shows up as a gap like in the full plot
+    i_min = bins.argmin(axis=1)
+    i_max = bins.argmax(axis=1)
+    offsets = np.arange(n_bins) * bin_size
+    indices = np.column_stack((offsets + np.minimum(i_min, i_max), offsets + np.maximum(i_min, i_max))).ravel()
+    # The samples after the last full bin are kept as they are
+    indices = np.concatenate((indices, np.arange(n_bins * bin_size, n)))
+    return time[indices], signal[indices]
+
 def plot_data(data, key):
     """
     Plots the signal and time data for a given key.
@@ -132,8 +496,10 @@ def plot_data(data, key):
         data (dict): The processed data.
         key (str): The key to plot.
     """
-    signal = data[key]['signal']
-    time = data[key]['time']
+    # Converted once here instead of inside Matplotlib, and thinned out to roughly the screen resolution
+    signal = np.asarray(data[key]['signal']).ravel()
+    time = np.asarray(data[key]['time']).ravel()
+    time, signal = decimate_for_plot(time, signal)
 
     plt.figure(figsize=(10, 5))
     plt.plot(time, signal)
@@ -143,33 +509,59 @@ def plot_data(data, key):
     plt.grid(True)
     plt.show()
 
-def download_existing_pickle(remote_file_path, local_file_path):
+def download_compressed(ssh_client, remote_file_path, local_file_path):
+    """
+    Downloads a file compressed with zstd: the server compresses it into the SSH channel with the zstd
+    command line tool and it is decompressed here while it arrives. The file on the server is left as it is.
+
+    Parameters:
+        ssh_client (paramiko.SSHClient): Connected client.
+        remote_file_path (str): The path to the file on the remote server.
+        local_file_path (str): The path to save the file on the local machine.
+
+    Returns:
+        bool: True if the file was downloaded, False if zstd is not available on either side.
+    """
+    if zstandard is None:
+        return False
+    channel = ssh_client.get_transport().open_session()
+    channel.exec_command("zstd -q -3 -c -- {}".format(shlex.quote(remote_file_path)))
+    # Written to a temporary file, so a failed transfer does not leave a truncated file behind
+    tmp_file_path = local_file_path + '.part'
+    with channel.makefile('rb') as remote_stream, open(tmp_file_path, 'wb') as local_file:
+        try:
+            zstandard.ZstdDecompressor().copy_stream(remote_stream, local_file, read_size=1 << 20, write_size=1 << 20)
+        except zstandard.ZstdError:
+            pass  # No (complete) zstd stream, e.g. zstd is not installed on the server; checked below
+    exit_status = channel.recv_exit_status()
+    channel.close()
+    if exit_status != 0:
+        os.remove(tmp_file_path)
+        return False
+    os.replace(tmp_file_path, local_file_path)
+    return True
+
+def download_existing_pickle(remote_file_path, local_file_path, client=None, compress=True):
     """
     Downloads an existing Pickle file from the remote server to the local machine.
 
     Parameters:
         remote_file_path (str): The path to the Pickle file on the remote server.
         local_file_path (str): The path to save the Pickle file on the local machine.
+        client (paramiko.SSHClient, optional): Connected client to use instead of the pooled one.
+        compress (bool): If the file shall be sent zstd compressed (needs the zstandard package here and
+            the zstd tool on the server); it is sent uncompressed over SFTP otherwise.
     """
     try:
-        # Initialize an SSH client
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # Accept unknown host keys
-        ssh_client.connect(hostname, port, username, password)  # Connect to the remote server
-        
-        # Open an SFTP session
-        sftp = ssh_client.open_sftp()
-        print("SFTP session established!")
-
-        # Download the Pickle file
+        # Reuse the pooled SSH connection (or the given client) and its SFTP session
+        ssh_client = client if client is not None else get_client()
+        sftp = get_sftp(ssh_client)
+
+        # Download the Pickle file, compressed on the wire if possible
         print("Attempting to download {} to {}".format(remote_file_path, local_file_path))
-        sftp.get(remote_file_path, local_file_path)
+        if not (compress and download_compressed(ssh_client, remote_file_path, local_file_path)):
+            sftp.get(remote_file_path, local_file_path)
         print("Downloaded {} to {}".format(remote_file_path, local_file_path))
-
-        # Close the SFTP session
-        sftp.close()
-        ssh_client.close()
-        print("SFTP session closed.")
     
     except Exception as e:
         # Handle any unexpected errors
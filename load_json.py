@@ -0,0 +1,195 @@
+import json
+import mmap
+import os
+import pickle
+import sys
+try:
+    import ijson
+except ImportError:  # ijson is optional, print_json_structure loads the whole file without it
+    ijson = None
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard json module is used without it
+    orjson = None
+
+# Indentation strings for the first nesting levels and the names of the JSON value types,
+# so that they are not rebuilt or looked up for every printed key
+_INDENTS = ['  ' * i for i in range(32)]
+_TYPE_NAMES = {dict: 'dict', list: 'list', str: 'str', int: 'int', float: 'float', bool: 'bool', type(None): 'NoneType'}
+# The same names for the ijson parser events (numbers are told apart by their value)
+_EVENT_TYPE_NAMES = {'start_map': 'dict', 'start_array': 'list', 'string': 'str', 'boolean': 'bool', 'null': 'NoneType'}
+
+
+def iter_structure(d, max_layers=-1, indent=0):
+    """
+    Generates the structure of a dictionary, including nested dictionaries, key by key in printing order.
+    The nested dictionaries are walked with an explicit stack instead of recursive calls, so the keys
+    are produced lazily (e.g. the first few with itertools.islice without walking the rest).
+    
+    Parameters:
+    - d: The dictionary to walk.
+    - max_layers: int; the depth of the deepest layer that should be generated (all layers if -1)
+    - indent: The indentation level of the first layer.
+    
+    Yields:
+    - (indent, key, type name) tuples
+    """
+    if indent == max_layers:
+        return
+    stack = [(iter(d.items()), indent)]
+    while stack:
+        items, depth = stack[-1]
+        for key, value in items:
+            value_type = type(value)
+            yield depth, key, _TYPE_NAMES.get(value_type) or value_type.__name__
+            # Descend into nested dictionaries unless the next layer is beyond max_layers;
+            # the remaining keys of this layer are continued once the nested one is done
+            if isinstance(value, dict) and depth + 1 != max_layers:
+                stack.append((iter(value.items()), depth + 1))
+                break
+        else:
+            stack.pop()
+
+
+def iter_json_structure(path, max_layers=-1):
+    """
+    Generates the structure of a json file like iter_structure does for the loaded dictionary, but from the
+    parser events of ijson while the file is read, so the file is never loaded into memory as a whole.
+    
+    Parameters:
+    - path: Path to the json file; its top level has to be an object.
+    - max_layers: int; the depth of the deepest layer that should be generated (all layers if -1)
+    
+    Yields:
+    - (indent, key, type name) tuples
+    """
+    with open(path, 'rb') as json_file:
+        # One entry per open object/array: the depth of its keys if they are generated, None otherwise
+        # (arrays, and objects inside arrays or beyond max_layers)
+        stack = []
+        key = None
+        for _, event, value in ijson.parse(json_file, buf_size=1 << 20):
+            if event == 'map_key':
+                key = value
+                continue
+            if event in ('end_map', 'end_array'):
+                stack.pop()
+                continue
+            depth = stack[-1] if stack else None
+            if depth is not None:
+                yield depth, key, _EVENT_TYPE_NAMES.get(event) or ('int' if isinstance(value, int) else 'float')
+            if event == 'start_map':
+                if not stack:
+                    stack.append(0 if max_layers != 0 else None)
+                else:
+                    stack.append(depth + 1 if depth is not None and depth + 1 != max_layers else None)
+            elif event == 'start_array':
+                stack.append(None)
+
+
+def format_structure(structure):
+    """
+    Formats (indent, key, type name) tuples as the lines printed by print_dict_structure.
+    """
+    return [(_INDENTS[depth] if depth < len(_INDENTS) else '  ' * depth) + '- ' + str(key) + ': ' + type_name
+            for depth, key, type_name in structure]
+
+
+def print_json_structure(path, max_layers=-1):
+    """
+    Prints the structure of a json file without loading it (see iter_json_structure), if ijson is installed;
+    otherwise the file is loaded and printed with print_dict_structure.
+    
+    Parameters:
+    - path: Path to the json file.
+    - max_layers: int; the depth of the deepest layer that should be printed
+    """
+    if ijson is None:
+        print_dict_structure(parse_json(path), max_layers)
+        return
+    lines = format_structure(iter_json_structure(path, max_layers))
+    if lines:
+        sys.stdout.write('\n'.join(lines) + '\n')
+
+
+def print_dict_structure(d, max_layers=-1, indent=0):
+    """
+    Prints the structure of a dictionary, including nested dictionaries.
+    All lines are written to stdout at once.
+    
+    Parameters:
+    - d: The dictionary to print the structure of.
+    - indent: The indentation level of the first layer (used for nested structures).
+    - max_layers: int; the depth of the deepest layer that should be printed
+    
+    Example:
+        print_dict_structure(d, 2); prints the first two layers of the dictionary d
+        
+    """
+    lines = format_structure(iter_structure(d, max_layers, indent))
+    if lines:
+        sys.stdout.write('\n'.join(lines) + '\n')
+
+
+def parse_json(path):
+    """
+    Parses a json file, with orjson if it is installed and the json module otherwise.
+    """
+    if orjson is None:
+        with open(path) as json_file:
+            return json.load(json_file)
+    # orjson parses the bytes of the memory-mapped file directly, without reading and decoding
+    # them into a str first
+    with open(path, 'rb') as json_file:
+        if os.fstat(json_file.fileno()).st_size == 0:
+            # An empty file can not be mapped; orjson raises the usual decode error for it
+            return orjson.loads(b'')
+        with mmap.mmap(json_file.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as buffer:
+            return orjson.loads(buffer)
+
+
+def load_json(path, print_=False, cache=True):
+    """
+    Converts json data to a dictionary
+    
+    Args:
+        path: string; Path to json file
+        print_ : boolean; If the structure of the json file shall be printed
+        cache: boolean; If the parsed data shall be stored in (and later loaded from) a pickle file next to
+            the json file, <path>.pkl, which is much faster to load. It is used as long as it is newer than
+            the json file.
+    
+    Returns:
+        disruption_data: dictionary (or sometimes list) of the json file
+        
+    Example:
+        json_dict = load_json(path)
+    
+    """
+
+    cache_path = path + '.pkl'
+    disruption_data = None
+    if cache and os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        try:
+            with open(cache_path, 'rb', buffering=1 << 20) as cache_file:
+                disruption_data = pickle.load(cache_file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            disruption_data = None  # Unreadable cache, the json file is parsed again
+
+    if disruption_data is None:
+        disruption_data = parse_json(path)
+        if cache:
+            # Written to a temporary file first, so that an interrupted write never leaves a truncated cache
+            tmp_path = cache_path + '.tmp'
+            try:
+                with open(tmp_path, 'wb') as cache_file:
+                    pickle.dump(disruption_data, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                print(f'Could not write the cache file {cache_path}: {e}')
+
+    if print_:
+        sys.stdout.write('The structure of the json file is\n\n')
+        print_dict_structure(disruption_data)
+
+    return disruption_data
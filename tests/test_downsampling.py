@@ -0,0 +1,56 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Processing_Data'))
+
+import downsampling
+
+
+def baseline_bin_mean(begin_time, end_time, time_series, signal_series, length):
+    """
+    The original pd.cut/groupby binning, with NaN for the bins without samples.
+    """
+    df = pd.DataFrame({'time': time_series, 'signal': signal_series})
+    df = df[(df['time'] >= begin_time) & (df['time'] <= end_time)]
+    bins = np.linspace(begin_time, end_time, length + 1)
+    df['bin'] = pd.cut(df['time'], bins, labels=False, include_lowest=True)
+    return df.groupby('bin')['signal'].mean().reindex(range(length)).values
+
+
+class TestDownsampleTimeseries(unittest.TestCase):
+
+    def assert_matches_baseline(self, begin_time, end_time, time, signal, length):
+        expected = baseline_bin_mean(begin_time, end_time, time, signal, length)
+        edges = np.linspace(begin_time, end_time, length + 1)
+        for bin_mean in (downsampling._bin_mean_numpy, downsampling._bin_mean):
+            result = bin_mean(time, signal, edges)
+            np.testing.assert_array_equal(np.isnan(result), np.isnan(expected))
+            np.testing.assert_allclose(result, expected, rtol=1e-12, equal_nan=True)
+
+    def test_samples_on_bin_edges(self):
+        time = np.linspace(0, 10, 1001)
+        self.assert_matches_baseline(0, 10, time, np.sin(time) + 2 * time, 1000)
+
+    def test_realistic_sampling(self):
+        time = np.arange(0, 8, 0.5e-3)
+        self.assert_matches_baseline(1, 7, time, np.cos(time) * time, 1000)
+
+    def test_nans_and_empty_bins(self):
+        time = np.sort(np.random.default_rng(0).uniform(0, 1, 300))
+        signal = np.random.default_rng(1).normal(size=300)
+        signal[::7] = np.nan
+        self.assert_matches_baseline(0, 1, time, signal, 1000)
+
+    def test_downsample_timeseries(self):
+        time = np.linspace(0, 10, 1001)
+        downsampled_time, downsampled_signal = downsampling.downsample_timeseries(0, 10, time, time, 1000)
+        np.testing.assert_array_equal(downsampled_time, np.linspace(0, 10, 1000))
+        np.testing.assert_allclose(downsampled_signal, baseline_bin_mean(0, 10, time, time, 1000), rtol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Models.helpers import _load_shots, IndependentCSVDatasetTCN, IndependentCSVDataset
+
+
+FEATURES = ['IPLA', 'WMHD']
+SEQ_LENGTH = 20
+
+
+def write_shots(data_path, lengths):
+    """
+    Writes a features and a targets CSV per shot; every value of shot i is i, so the shots can be told apart.
+    """
+    os.makedirs(os.path.join(data_path, 'features'))
+    os.makedirs(os.path.join(data_path, 'targets'))
+    names = []
+    for i, length in enumerate(lengths):
+        name = f'JET{i}.csv'
+        pd.DataFrame({'time': np.arange(length), 'IPLA': np.full(length, i), 'WMHD': np.full(length, i)}) \
+            .to_csv(os.path.join(data_path, 'features', name), index=False)
+        pd.DataFrame({'time': np.arange(length), 'target': np.full(length, i)}) \
+            .to_csv(os.path.join(data_path, 'targets', name), index=False)
+        names.append(name)
+    return names
+
+
+class TestLoadShotsCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_path = self.tmp.name
+        # Shot 2 has an unexpected length and is skipped
+        self.names = write_shots(self.data_path, [SEQ_LENGTH, SEQ_LENGTH, SEQ_LENGTH - 1, SEQ_LENGTH, SEQ_LENGTH])
+        self.cache_path = os.path.join(self.data_path, 'cache')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def load(self, names, features=FEATURES, seq_length=SEQ_LENGTH):
+        return _load_shots(self.data_path, names, features, seq_length, None, self.cache_path)
+
+    def test_cache_returns_requested_order(self):
+        x_fresh, y_fresh = self.load(self.names)
+        reordered = [self.names[i] for i in (4, 2, 0, 3, 1)]
+        x_cached, y_cached = self.load(reordered)
+        np.testing.assert_array_equal(x_cached[:, 0, 0], [4, 0, 3, 1])
+        np.testing.assert_array_equal(y_cached[:, 0], [4, 0, 3, 1])
+        np.testing.assert_array_equal(x_fresh[:, 0, 0], [0, 1, 3, 4])
+
+    def test_cache_checks_features_and_seq_length(self):
+        self.load(self.names)
+        x_all, _ = self.load(self.names, features=['IPLA'])
+        self.assertEqual(x_all.shape, (4, SEQ_LENGTH, 1))
+        x_all, _ = self.load(self.names, seq_length=SEQ_LENGTH - 1)
+        np.testing.assert_array_equal(x_all[:, 0, 0], [2])
+
+
+class TestDatasetSeed(unittest.TestCase):
+
+    def test_seed_order_survives_the_cache(self):
+        with tempfile.TemporaryDirectory() as data_path:
+            names = write_shots(data_path, [SEQ_LENGTH] * 8)
+            for dataset_class, kwargs in ((IndependentCSVDatasetTCN, {}),
+                                          (IndependentCSVDataset, {'window': 10, 'stride': 10})):
+                cache_path = os.path.join(data_path, dataset_class.__name__)
+                # The cache is written in the order of seed 1 and then read for seed 5
+                dataset_class(data_path, names, FEATURES, seq_length=SEQ_LENGTH, cache_path=cache_path, seed=1, **kwargs)
+                cached = dataset_class(data_path, names, FEATURES, seq_length=SEQ_LENGTH, cache_path=cache_path, seed=5, **kwargs)
+                fresh = dataset_class(data_path, names, FEATURES, seq_length=SEQ_LENGTH, seed=5, **kwargs)
+                self.assertEqual(len(fresh), len(cached))
+                for (x_fresh, y_fresh), (x_cached, y_cached) in zip(fresh.samples, cached.samples):
+                    np.testing.assert_array_equal(x_fresh.numpy(), x_cached.numpy())
+                    np.testing.assert_array_equal(y_fresh.numpy(), y_cached.numpy())
+
+if __name__ == '__main__':
+    unittest.main()